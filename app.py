@@ -2,6 +2,7 @@ import os
 import logging
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import inspect, text
 from sqlalchemy.orm import DeclarativeBase
 
 # Configure logging
@@ -16,6 +17,9 @@ db = SQLAlchemy(model_class=Base)
 app = Flask(__name__)
 app.secret_key = os.environ.get("SESSION_SECRET", "dev_secret_key_change_in_production")
 
+# Let a front-end server send local files named by an X-Sendfile header
+app.config["USE_X_SENDFILE"] = os.environ.get("ASSET_OFFLOAD", "").lower() == "x-sendfile"
+
 # Configure the database
 app.config["SQLALCHEMY_DATABASE_URI"] = os.environ.get("DATABASE_URL", "sqlite:///visualtales.db")
 app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
@@ -26,10 +30,67 @@ app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
 # Initialize the app with the extension
 db.init_app(app)
 
+def _add_missing_columns():
+    """Add columns introduced after a table was first created (create_all only creates new tables)"""
+    inspector = inspect(db.engine)
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing or not column.nullable:
+                continue
+            column_type = column.type.compile(dialect=db.engine.dialect)
+            with db.engine.begin() as conn:
+                conn.execute(text(f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {column_type}'))
+            logging.info(f"Added column {table.name}.{column.name}")
+
+def _ensure_panel_number_index():
+    """
+    Add the unique (comic_id, panel_number) index to panel tables created before it existed
+
+    Duplicate numbers left by earlier concurrent requests are resolved first
+    by moving every panel but the oldest to the end of its comic.
+    """
+    inspector = inspect(db.engine)
+    if not inspector.has_table('panel'):
+        return
+    columns = ['comic_id', 'panel_number']
+    if any(constraint['column_names'] == columns for constraint in inspector.get_unique_constraints('panel')) or \
+            any(index['unique'] and index['column_names'] == columns for index in inspector.get_indexes('panel')):
+        return
+
+    with db.engine.begin() as conn:
+        duplicates = conn.execute(text(
+            'SELECT id, comic_id FROM panel p WHERE EXISTS ('
+            'SELECT 1 FROM panel q WHERE q.comic_id = p.comic_id AND q.panel_number = p.panel_number AND q.id < p.id'
+            ') ORDER BY id'
+        )).all()
+        for panel_id, comic_id in duplicates:
+            conn.execute(text(
+                'UPDATE panel SET panel_number = '
+                '(SELECT MAX(panel_number) + 1 FROM panel WHERE comic_id = :comic_id) WHERE id = :panel_id'
+            ), {'comic_id': comic_id, 'panel_id': panel_id})
+            logging.warning(f"Renumbered duplicate panel {panel_id} of comic {comic_id}")
+        conn.execute(text(
+            'CREATE UNIQUE INDEX IF NOT EXISTS uq_panel_comic_number ON panel (comic_id, panel_number)'
+        ))
+    logging.info("Added unique index uq_panel_comic_number")
+
 with app.app_context():
     # Import models to ensure tables are created
     import models
     db.create_all()
+    _add_missing_columns()
+    _ensure_panel_number_index()
     
     # Import routes
     import routes
+
+    # Periodically remove orphaned assets and expired exports
+    from services.asset_gc import start_sweeper
+    start_sweeper()
+
+    # Resume background jobs a previous process left queued or running
+    from services.job_queue import start_recovery
+    start_recovery()
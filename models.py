@@ -1,6 +1,7 @@
 from app import db
 from datetime import datetime
 import json
+from utils.character_index import get_character_index
 
 class Comic(db.Model):
     """Model for storing comic strips"""
@@ -27,9 +28,15 @@ class Comic(db.Model):
     def set_characters_dict(self, characters_dict):
         """Set characters from dictionary"""
         self.characters = json.dumps(characters_dict)
+    
+    def get_character_index(self):
+        """Return the compiled character matcher, cached per character JSON"""
+        return get_character_index(self.characters)
 
 class Panel(db.Model):
     """Model for individual comic panels"""
+    __table_args__ = (db.UniqueConstraint('comic_id', 'panel_number', name='uq_panel_comic_number'),)
+    
     id = db.Column(db.Integer, primary_key=True)
     comic_id = db.Column(db.Integer, db.ForeignKey('comic.id'), nullable=False)
     panel_number = db.Column(db.Integer, nullable=False)
@@ -38,8 +45,49 @@ class Panel(db.Model):
     image_path = db.Column(db.String(500))
     narration_text = db.Column(db.Text)
     audio_path = db.Column(db.String(500))
+    audio_outdated = db.Column(db.Boolean, default=False)  # narration_text changed since audio_path was made
+    image_variants = db.Column(db.Text)  # JSON list of resized WebP/JPEG derivatives
+    image_width = db.Column(db.Integer)
+    image_height = db.Column(db.Integer)
+    image_bytes = db.Column(db.Integer)
+    status = db.Column(db.String(20), default='ready')  # pending, ready or failed
+    error_message = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    @property
+    def is_pending(self):
+        return self.status == 'pending'
+    
+    @property
+    def is_failed(self):
+        return self.status == 'failed'
+    
+    def get_image_variants(self, fmt=None):
+        """Return image derivatives, optionally only those in one format, smallest first"""
+        if not self.image_variants:
+            return []
+        try:
+            variants = json.loads(self.image_variants)
+        except json.JSONDecodeError:
+            return []
+        if fmt:
+            variants = [variant for variant in variants if variant.get('format') == fmt]
+        return sorted(variants, key=lambda variant: variant.get('width', 0))
+    
+    def set_image(self, image):
+        """Point the panel at a newly ingested image, dropping derivatives of the old one"""
+        self.image_path = image.path
+        self.image_width = image.width
+        self.image_height = image.height
+        self.image_bytes = image.bytes
+        self.image_variants = None
+    
+    def asset_paths(self):
+        """Return every file path this panel references"""
+        paths = [self.image_path, self.audio_path]
+        paths.extend(variant.get('path') for variant in self.get_image_variants())
+        return [path for path in paths if path]
+    
     def __repr__(self):
         return f'<Panel {self.panel_number} of Comic {self.comic_id}>'
 
@@ -53,3 +101,68 @@ class Character(db.Model):
     
     def __repr__(self):
         return f'<Character {self.name}>'
+
+class Job(db.Model):
+    """Model for background jobs processed by the job queue"""
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)
+    status = db.Column(db.String(20), default='queued', nullable=False, index=True)  # queued, running, done, failed
+    payload = db.Column(db.Text)  # JSON string of job arguments
+    result = db.Column(db.Text)  # JSON string of job result
+    error_message = db.Column(db.Text)
+    comic_id = db.Column(db.Integer, db.ForeignKey('comic.id', ondelete='SET NULL'))
+    panel_id = db.Column(db.Integer, db.ForeignKey('panel.id', ondelete='SET NULL'))
+    attempts = db.Column(db.Integer, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    
+    def get_payload(self):
+        """Return payload as dictionary"""
+        return json.loads(self.payload) if self.payload else {}
+    
+    def get_result(self):
+        """Return result as dictionary"""
+        return json.loads(self.result) if self.result else {}
+    
+    def set_result(self, result):
+        """Set result from dictionary"""
+        self.result = json.dumps(result)
+    
+    @property
+    def is_finished(self):
+        return self.status in ('done', 'failed')
+    
+    def to_dict(self):
+        """Return a JSON-serialisable view of the job for status polling"""
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'comic_id': self.comic_id,
+            'panel_id': self.panel_id,
+            'result': self.get_result(),
+            'error': self.error_message,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+        }
+    
+    def __repr__(self):
+        return f'<Job {self.id} {self.kind} {self.status}>'
+
+class IdempotencyKey(db.Model):
+    """Model recording the outcome of a POST sent with an idempotency key"""
+    id = db.Column(db.Integer, primary_key=True)
+    key = db.Column(db.String(100), unique=True, nullable=False)
+    endpoint = db.Column(db.String(100), nullable=False)
+    fingerprint = db.Column(db.String(64), nullable=False)  # hash of the request arguments
+    status = db.Column(db.String(20), default='in_progress', nullable=False)  # in_progress or completed
+    response_status = db.Column(db.Integer)
+    response_location = db.Column(db.String(500))
+    response_body = db.Column(db.Text)
+    response_mimetype = db.Column(db.String(100))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    
+    def __repr__(self):
+        return f'<IdempotencyKey {self.key} {self.status}>'
@@ -1,11 +1,38 @@
 import os
 import logging
-from flask import render_template, request, redirect, url_for, flash, jsonify, send_file
+import uuid
+import mimetypes
+from urllib.parse import quote
+from itertools import chain
+from flask import render_template, request, redirect, url_for, flash, jsonify, send_from_directory, abort, Response, stream_with_context
+from sqlalchemy.exc import IntegrityError
 from app import app, db
-from models import Comic, Panel, Character
-from services.gemini_service import generate_comic_panel, edit_panel_with_instruction
-from services.elevenlabs_service import generate_narration_audio
-from utils.pdf_generator import create_comic_pdf
+from models import Comic, Panel, Character, Job
+from services.gemini_service import edit_panel_with_instruction, image_cache
+from services.elevenlabs_service import generate_narration_audio, stream_narration_audio, narration_cache, voice_catalog
+from services.job_queue import enqueue_job, get_job
+from services.idempotency import idempotent
+from services.image_derivatives import schedule_derivatives
+from services.outbound import outbound_metrics
+from services.storage import get_storage, S3_PRESIGN_EXPIRES, STORAGE_CHUNK_SIZE
+from services.asset_gc import asset_reference_count, last_run as last_asset_gc
+from services import panel_jobs  # registers panel job handlers
+from services.export_jobs import EXPORT_JOB_KINDS  # registers export job handlers
+from utils.cbz_generator import plan_comic_cbz, stream_comic_cbz
+from utils.pdf_generator import export_comic_pdf, pdf_image_cache, pdf_fragment_cache, PDF_PRESETS, DEFAULT_PDF_PRESET
+from utils.audiobook import audiobook_path, plan_audiobook, stream_audiobook
+from utils.asset_files import asset_hash
+
+STORYBOARD_MAX_PANELS = int(os.environ.get("STORYBOARD_MAX_PANELS", "24"))
+
+# Generated files live under these static/ subdirectories
+ASSET_DIRECTORIES = ('images', 'audio', 'exports')
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+# "x-sendfile" (Apache/lighttpd) or "x-accel-redirect" (nginx) hands local file
+# transfers to the front-end server; X_ACCEL_REDIRECT_PREFIX is its internal location
+ASSET_OFFLOAD = os.environ.get("ASSET_OFFLOAD", "").lower()
+X_ACCEL_REDIRECT_PREFIX = os.environ.get("X_ACCEL_REDIRECT_PREFIX", "/internal/")
 
 def generate_panel_title(scene_description):
     """Generate a short title from scene description"""
@@ -34,6 +61,179 @@ def generate_panel_title(scene_description):
     
     return title or "New Panel"
 
+def _wants_json():
+    """Whether the client asked for a JSON response instead of a redirect"""
+    return request.is_json or request.accept_mimetypes.best == 'application/json'
+
+def _active_panel_jobs(comic_id):
+    """Map panel id to its queued or running job so pending panels can poll for status"""
+    jobs = Job.query.filter(Job.comic_id == comic_id, Job.kind.in_(['generate_panel', 'generate_storyboard']),
+                            Job.status.in_(['queued', 'running'])).all()
+    panel_jobs = {}
+    for job in jobs:
+        panel_ids = [job.panel_id] if job.panel_id else job.get_payload().get('panel_ids', [])
+        for panel_id in panel_ids:
+            panel_jobs[panel_id] = job
+    return panel_jobs
+
+def _create_pending_panels(comic, scenes, attempts=3):
+    """
+    Create consecutive pending panels after the comic's last panel
+    
+    Panel numbers are unique per comic, so if a concurrent request takes the
+    same numbers the insert fails and is retried with fresh numbers.
+    """
+    for attempt in range(attempts):
+        last_panel = Panel.query.filter_by(comic_id=comic.id).order_by(Panel.panel_number.desc()).first()
+        first_number = (last_panel.panel_number + 1) if last_panel else 1
+        
+        panels = []
+        for offset, scene in enumerate(scenes):
+            scene_description = scene['scene_description'].strip()
+            narration_text = (scene.get('narration_text') or '').strip()
+            panel = Panel(
+                comic_id=comic.id,
+                panel_number=first_number + offset,
+                title=generate_panel_title(scene_description),
+                description=scene_description,
+                narration_text=narration_text if narration_text else None,
+                status='pending'
+            )
+            db.session.add(panel)
+            panels.append(panel)
+        
+        try:
+            db.session.commit()
+            return panels
+        except IntegrityError:
+            db.session.rollback()
+            logging.warning(f"Panel number collision for comic {comic.id}, retrying")
+    
+    raise RuntimeError(f"Could not allocate panel numbers for comic {comic.id}")
+
+def _parse_storyboard_form(text):
+    """Parse one scene per line, with optional narration after a '|' separator"""
+    scenes = []
+    for line in text.splitlines():
+        scene, _, narration = line.partition('|')
+        if scene.strip():
+            scenes.append({'scene_description': scene.strip(), 'narration_text': narration.strip()})
+    return scenes
+
+@app.context_processor
+def inject_idempotency_key():
+    """Give each rendered form a fresh key so resubmits of that form are deduplicated"""
+    return {'idempotency_key': lambda: uuid.uuid4().hex}
+
+@app.template_global()
+def asset_url(path):
+    """URL for a generated file; content-hashed files are served with immutable caching"""
+    filename = path.replace('static/', '', 1)
+    # Files in remote storage always go through /assets, which redirects to the store
+    if asset_hash(path) or get_storage().name != 'local':
+        return url_for('serve_asset', filename=filename)
+    return url_for('static', filename=filename)
+
+@app.template_global()
+def panel_srcset(panel, fmt):
+    """Build a srcset attribute value from a panel's derivatives in one format"""
+    return ', '.join(
+        f"{asset_url(variant['path'])} {variant['width']}w"
+        for variant in panel.get_image_variants(fmt)
+    )
+
+def _send_asset(path, immutable=False, **kwargs):
+    """
+    Send a generated file with conditional-GET and Range support
+    
+    Content-hashed files get a strong ETag derived from their name. Only a
+    URL that names the content itself, as /assets does, may be cached for a
+    year as immutable; download routes such as exports serve different files
+    from the same URL over time, so clients revalidate them on every use.
+    When the storage backend can hand out direct URLs the client is
+    redirected there instead, so the bytes never pass through the app.
+    
+    Args:
+        path (str): Asset key
+        immutable (bool): Whether the request URL always maps to this content
+    """
+    storage = get_storage()
+    immutable = immutable and bool(asset_hash(path))
+    direct_url = storage.url(path, download_name=kwargs.get('download_name') if kwargs.get('as_attachment') else None)
+    if direct_url:
+        response = redirect(direct_url)
+        if immutable:
+            # The presigned URL expires, so only cache the redirect for part of its lifetime
+            response.headers['Cache-Control'] = f'private, max-age={S3_PRESIGN_EXPIRES // 2}'
+        else:
+            response.headers['Cache-Control'] = 'private, no-cache'
+        return response
+    
+    if ASSET_OFFLOAD == 'x-accel-redirect':
+        return _accel_redirect(path, immutable=immutable, **kwargs)
+    
+    # With ASSET_OFFLOAD=x-sendfile, USE_X_SENDFILE makes these send only an X-Sendfile header
+    if not asset_hash(path):
+        return send_from_directory(storage.root, path, conditional=True, **kwargs)
+    
+    etag = quote(os.path.splitext(os.path.basename(path))[0])
+    if not immutable:
+        response = send_from_directory(storage.root, path, conditional=True, etag=etag, **kwargs)
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
+    
+    response = send_from_directory(storage.root, path, conditional=True, etag=etag,
+                                   max_age=IMMUTABLE_MAX_AGE, **kwargs)
+    response.headers['Cache-Control'] = f'public, max-age={IMMUTABLE_MAX_AGE}, immutable'
+    return response
+
+def _accel_redirect(path, immutable=False, as_attachment=False, download_name=None):
+    """Let nginx send a local file; it handles Range and conditional requests itself"""
+    response = Response(mimetype=mimetypes.guess_type(path)[0] or 'application/octet-stream')
+    response.headers['X-Accel-Redirect'] = X_ACCEL_REDIRECT_PREFIX + quote(path)
+    if as_attachment:
+        response.headers['Content-Disposition'] = _attachment_disposition(download_name or os.path.basename(path))
+    if immutable:
+        response.headers['Cache-Control'] = f'public, max-age={IMMUTABLE_MAX_AGE}, immutable'
+    else:
+        response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+def _stream_download(buffer, mimetype, download_name):
+    """Stream an open file object to the client as a download, closing it afterwards"""
+    buffer.seek(0, os.SEEK_END)
+    length = buffer.tell()
+    buffer.seek(0)
+    
+    # A plain generator rather than the server's file wrapper: gunicorn's sendfile
+    # asks for fileno(), which would roll an in-memory spool over to disk
+    def chunks():
+        with buffer:
+            yield from iter(lambda: buffer.read(STORAGE_CHUNK_SIZE), b'')
+    
+    response = Response(chunks(), mimetype=mimetype, direct_passthrough=True)
+    response.headers['Content-Length'] = str(length)
+    response.headers['Content-Disposition'] = _attachment_disposition(download_name)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+def _attachment_disposition(filename):
+    """Content-Disposition value for a download, with a UTF-8 name for non-ASCII titles"""
+    fallback = filename.encode('ascii', 'ignore').decode().replace('"', '') or 'download'
+    return f"attachment; filename=\"{fallback}\"; filename*=UTF-8''{quote(filename)}"
+
+def _remove_panel_files(panels):
+    """Delete the files of panels being removed unless another panel shares them"""
+    storage = get_storage()
+    excluded_panel_ids = [panel.id for panel in panels]
+    paths = {path for panel in panels for path in panel.asset_paths()}
+    for path in paths:
+        references = asset_reference_count(path, excluded_panel_ids)
+        if references:
+            logging.info(f"Keeping {path}, still used by {references} other panel(s)")
+            continue
+        storage.delete(path)
+
 @app.route('/')
 def index():
     """Main page - show recent comics and creation form"""
@@ -74,14 +274,17 @@ def view_comic(comic_id):
     """View a specific comic"""
     comic = Comic.query.get_or_404(comic_id)
     panels = Panel.query.filter_by(comic_id=comic_id).order_by(Panel.panel_number).all()
-    return render_template('comic.html', comic=comic, panels=panels, view_mode=True)
+    return render_template('comic.html', comic=comic, panels=panels, view_mode=True,
+                           panel_jobs=_active_panel_jobs(comic_id))
 
 @app.route('/comic/<int:comic_id>/edit')
 def edit_comic(comic_id):
     """Edit a specific comic"""
     comic = Comic.query.get_or_404(comic_id)
     panels = Panel.query.filter_by(comic_id=comic_id).order_by(Panel.panel_number).all()
-    return render_template('comic.html', comic=comic, panels=panels, view_mode=False)
+    return render_template('comic.html', comic=comic, panels=panels, view_mode=False,
+                           panel_jobs=_active_panel_jobs(comic_id),
+                           play_panel_id=request.args.get('play', type=int))
 
 @app.route('/comic/<int:comic_id>/add_character', methods=['POST'])
 def add_character(comic_id):
@@ -162,8 +365,9 @@ def delete_character(comic_id, character_name):
         return redirect(url_for('edit_comic', comic_id=comic_id))
 
 @app.route('/comic/<int:comic_id>/generate_panel', methods=['POST'])
+@idempotent
 def generate_panel(comic_id):
-    """Generate a new panel for the comic"""
+    """Queue a new panel for generation by the background job queue"""
     try:
         comic = Comic.query.get_or_404(comic_id)
         
@@ -171,59 +375,120 @@ def generate_panel(comic_id):
         narration_text = request.form.get('narration_text', '').strip()
         
         if not scene_description:
+            if _wants_json():
+                return jsonify({'error': 'Scene description is required'}), 400
             flash('Scene description is required', 'error')
             return redirect(url_for('edit_comic', comic_id=comic_id))
         
-        # Get next panel number
-        last_panel = Panel.query.filter_by(comic_id=comic_id).order_by(Panel.panel_number.desc()).first()
-        panel_number = (last_panel.panel_number + 1) if last_panel else 1
-        
-        # Generate the panel image
-        characters = comic.get_characters_dict()
-        image_path = generate_comic_panel(
-            scene_description=scene_description,
-            characters=characters,
-            style=comic.style,
-            panel_number=panel_number
-        )
+        # Create the panel in a pending state; the worker fills in image and audio
+        panel = _create_pending_panels(comic, [{'scene_description': scene_description,
+                                                'narration_text': narration_text}])[0]
+        panel_number = panel.panel_number
         
-        if not image_path:
-            flash('Failed to generate panel image. Please check your API key and try again.', 'error')
-            return redirect(url_for('edit_comic', comic_id=comic_id))
+        job = enqueue_job('generate_panel', comic_id=comic.id, panel_id=panel.id)
         
-        # Generate audio if narration is provided
-        audio_path = None
-        if narration_text:
-            from services.elevenlabs_service import generate_narration_audio
-            audio_path = generate_narration_audio(narration_text, panel_number)
-            if not audio_path:
-                flash('Panel generated successfully, but voice narration failed. You can add it later.', 'warning')
-        
-        # Generate panel title from scene description
-        panel_title = generate_panel_title(scene_description)
-        
-        # Create panel record
-        panel = Panel(
-            comic_id=comic_id,
-            panel_number=panel_number,
-            title=panel_title,
-            description=scene_description,
-            image_path=image_path,
-            narration_text=narration_text if narration_text else None,
-            audio_path=audio_path
-        )
-        db.session.add(panel)
-        db.session.commit()
+        if _wants_json():
+            return jsonify({
+                'job_id': job.id,
+                'panel_id': panel.id,
+                'panel_number': panel_number,
+                'status_url': url_for('job_status', job_id=job.id)
+            }), 202
         
-        flash(f'Panel {panel_number} generated successfully!', 'success')
+        flash(f'Panel {panel_number} is being generated. It will appear here when ready.', 'info')
         return redirect(url_for('edit_comic', comic_id=comic_id))
         
     except Exception as e:
         logging.error(f"Error generating panel: {e}")
+        db.session.rollback()
+        if _wants_json():
+            return jsonify({'error': 'Error generating panel. Please try again.'}), 500
         flash('Error generating panel. Please try again.', 'error')
         return redirect(url_for('edit_comic', comic_id=comic_id))
 
+@app.route('/comic/<int:comic_id>/generate_storyboard', methods=['POST'])
+@idempotent
+def generate_storyboard(comic_id):
+    """Queue several panels at once; they are generated concurrently by one job"""
+    try:
+        comic = Comic.query.get_or_404(comic_id)
+        
+        if request.is_json:
+            scenes = (request.get_json(silent=True) or {}).get('panels', [])
+        else:
+            scenes = _parse_storyboard_form(request.form.get('storyboard', ''))
+        
+        scenes = [scene for scene in scenes if isinstance(scene, dict) and (scene.get('scene_description') or '').strip()]
+        if not scenes:
+            if _wants_json():
+                return jsonify({'error': 'At least one scene description is required'}), 400
+            flash('At least one scene description is required', 'error')
+            return redirect(url_for('edit_comic', comic_id=comic_id))
+        
+        if len(scenes) > STORYBOARD_MAX_PANELS:
+            message = f'A storyboard can have at most {STORYBOARD_MAX_PANELS} panels'
+            if _wants_json():
+                return jsonify({'error': message}), 400
+            flash(message, 'error')
+            return redirect(url_for('edit_comic', comic_id=comic_id))
+        
+        # Assign panel numbers up front so concurrent generation keeps the story order
+        panels = _create_pending_panels(comic, scenes)
+        
+        job = enqueue_job('generate_storyboard', {'panel_ids': [panel.id for panel in panels]}, comic_id=comic.id)
+        
+        if _wants_json():
+            return jsonify({
+                'job_id': job.id,
+                'panels': [{'panel_id': panel.id, 'panel_number': panel.panel_number} for panel in panels],
+                'status_url': url_for('job_status', job_id=job.id)
+            }), 202
+        
+        flash(f'{len(panels)} panels are being generated. They will appear here when ready.', 'info')
+        return redirect(url_for('edit_comic', comic_id=comic_id))
+        
+    except Exception as e:
+        logging.error(f"Error generating storyboard: {e}")
+        db.session.rollback()
+        if _wants_json():
+            return jsonify({'error': 'Error generating storyboard. Please try again.'}), 500
+        flash('Error generating storyboard. Please try again.', 'error')
+        return redirect(url_for('edit_comic', comic_id=comic_id))
+
+@app.route('/assets/<path:filename>')
+def serve_asset(filename):
+    """Serve generated images, audio and exports"""
+    if filename.split('/', 1)[0] not in ASSET_DIRECTORIES or '..' in filename.split('/'):
+        abort(404)
+    return _send_asset(f"static/{filename}", immutable=True)
+
+@app.route('/voices')
+def list_voices():
+    """Return the cached ElevenLabs voice catalogue as JSON"""
+    voices = [
+        {
+            'voice_id': voice.get('voice_id'),
+            'name': voice.get('name'),
+            'category': voice.get('category'),
+            'labels': voice.get('labels') or {},
+            'preview_url': voice.get('preview_url')
+        }
+        for voice in voice_catalog.voices()
+    ]
+    response = jsonify({'voices': voices, **voice_catalog.info()})
+    response.headers['Cache-Control'] = 'private, max-age=60'
+    return response
+
+@app.route('/jobs/<int:job_id>')
+def job_status(job_id):
+    """Return the status of a background job for polling"""
+    job = get_job(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job.to_dict())
+
 @app.route('/panel/<int:panel_id>/edit', methods=['POST'])
+@idempotent
 def edit_panel(panel_id):
     """Edit an existing panel with natural language instructions"""
     try:
@@ -236,10 +501,10 @@ def edit_panel(panel_id):
         
         # Get comic and characters for consistency
         comic = panel.comic
-        characters = comic.get_characters_dict()
+        characters = comic.get_character_index()
         
         # Edit the panel
-        new_image_path = edit_panel_with_instruction(
+        new_image = edit_panel_with_instruction(
             current_image_path=panel.image_path,
             edit_instruction=edit_instruction,
             original_description=panel.description,
@@ -247,14 +512,15 @@ def edit_panel(panel_id):
             style=comic.style
         )
         
-        if not new_image_path:
+        if not new_image:
             flash('Failed to edit panel. Please try again.', 'error')
             return redirect(url_for('edit_comic', comic_id=panel.comic_id))
         
         # Update panel
-        panel.image_path = new_image_path
+        panel.set_image(new_image)
         panel.description += f" [Edited: {edit_instruction}]"
         db.session.commit()
+        schedule_derivatives(panel.id, new_image.path)
         
         flash('Panel edited successfully!', 'success')
         return redirect(url_for('edit_comic', comic_id=panel.comic_id))
@@ -265,6 +531,7 @@ def edit_panel(panel_id):
         return redirect(url_for('edit_comic', comic_id=panel.comic_id))
 
 @app.route('/panel/<int:panel_id>/narrate', methods=['POST'])
+@idempotent
 def add_narration(panel_id):
     """Add narration to a panel"""
     try:
@@ -275,6 +542,18 @@ def add_narration(panel_id):
             flash('Narration text is required', 'error')
             return redirect(url_for('edit_comic', comic_id=panel.comic_id))
         
+        if request.form.get('stream'):
+            # Save the text and synthesise in a job; the page plays the audio from the
+            # streaming endpoint as it arrives. The previous audio is kept, but no longer
+            # played or exported, until the new narration has been stored.
+            if narration_text != panel.narration_text or panel.audio_outdated or not panel.audio_path:
+                panel.narration_text = narration_text
+                panel.audio_outdated = bool(panel.audio_path)
+                db.session.commit()
+                enqueue_job('narrate_panel', {'narration_text': narration_text},
+                            comic_id=panel.comic_id, panel_id=panel.id)
+            return redirect(url_for('edit_comic', comic_id=panel.comic_id, play=panel.id))
+        
         # Generate audio
         audio_path = generate_narration_audio(narration_text, panel.id)
         
@@ -282,6 +561,7 @@ def add_narration(panel_id):
         panel.narration_text = narration_text
         if audio_path:
             panel.audio_path = audio_path
+            panel.audio_outdated = False
         db.session.commit()
         
         flash('Narration added successfully!', 'success')
@@ -292,9 +572,44 @@ def add_narration(panel_id):
         flash('Error adding narration. Please try again.', 'error')
         return redirect(url_for('edit_comic', comic_id=panel.comic_id))
 
+@app.route('/panel/<int:panel_id>/narration/stream')
+def stream_narration(panel_id):
+    """
+    Stream a panel's narration to the browser while it is being synthesised
+    
+    The audio is saved as the panel's narration once synthesis completes,
+    whether or not the browser listens to the end; after that this
+    redirects to the stored file.
+    """
+    panel = Panel.query.get_or_404(panel_id)
+    if panel.audio_path and not panel.audio_outdated and get_storage().exists(panel.audio_path):
+        return redirect(asset_url(panel.audio_path))
+    if not panel.narration_text:
+        abort(404)
+    
+    narration_text = panel.narration_text
+    
+    def save_audio(audio_path):
+        panel = db.session.get(Panel, panel_id)
+        # Skip if the panel was deleted or its narration changed mid-stream
+        if panel is not None and panel.narration_text == narration_text:
+            panel.audio_path = audio_path
+            panel.audio_outdated = False
+            db.session.commit()
+    
+    chunks = stream_narration_audio(narration_text, panel_id, on_complete=save_audio)
+    
+    # Pull the first chunk before sending headers so failures still get an error status
+    first_chunk = next(chunks, None)
+    if first_chunk is None:
+        return jsonify({'error': 'Narration could not be generated.'}), 502
+    
+    return Response(stream_with_context(chain([first_chunk], chunks)), mimetype='audio/mpeg',
+                    headers={'Cache-Control': 'no-store'})
+
 @app.route('/comic/<int:comic_id>/export_pdf')
 def export_pdf(comic_id):
-    """Export comic as PDF"""
+    """Export comic as PDF; ?preset=screen|print picks the image resolution"""
     try:
         comic = Comic.query.get_or_404(comic_id)
         panels = Panel.query.filter_by(comic_id=comic_id).order_by(Panel.panel_number).all()
@@ -303,20 +618,153 @@ def export_pdf(comic_id):
             flash('No panels to export', 'error')
             return redirect(url_for('view_comic', comic_id=comic_id))
         
-        # Generate PDF
-        pdf_path = create_comic_pdf(comic, panels)
+        preset = request.args.get('preset', DEFAULT_PDF_PRESET)
+        if preset not in PDF_PRESETS:
+            flash(f'Unknown export preset "{preset}"', 'error')
+            return redirect(url_for('view_comic', comic_id=comic_id))
+        
+        # Generate PDF, or reuse the stored one if the comic is unchanged
+        pdf_path, buffer = export_comic_pdf(comic, panels, preset)
         
-        if not pdf_path or not os.path.exists(pdf_path):
+        if not pdf_path:
             flash('Error creating PDF', 'error')
             return redirect(url_for('view_comic', comic_id=comic_id))
         
-        return send_file(pdf_path, as_attachment=True, download_name=f"{comic.title}.pdf")
+        download_name = f"{comic.title}.pdf" if preset == DEFAULT_PDF_PRESET else f"{comic.title} ({preset}).pdf"
+        if buffer is None:
+            return _send_asset(pdf_path, as_attachment=True, download_name=download_name)
+        
+        # Freshly built: stream the in-memory copy rather than reading the stored file back
+        return _stream_download(buffer, 'application/pdf', download_name)
         
     except Exception as e:
         logging.error(f"Error exporting PDF: {e}")
         flash('Error exporting PDF. Please try again.', 'error')
         return redirect(url_for('view_comic', comic_id=comic_id))
 
+@app.route('/comic/<int:comic_id>/export_cbz')
+def export_cbz(comic_id):
+    """Export the panel images and comic metadata as a CBZ comic book archive"""
+    try:
+        comic = Comic.query.get_or_404(comic_id)
+        panels = Panel.query.filter_by(comic_id=comic_id).order_by(Panel.panel_number).all()
+        
+        comic_info, pages = plan_comic_cbz(comic, panels)
+        if not pages:
+            flash('No panel images to export', 'error')
+            return redirect(url_for('view_comic', comic_id=comic_id))
+        
+        # Images are copied as stored, so the archive streams in constant memory
+        response = Response(stream_with_context(stream_comic_cbz(comic_info, pages, comic.created_at)),
+                            mimetype='application/vnd.comicbook+zip')
+        response.headers['Content-Disposition'] = _attachment_disposition(f"{comic.title}.cbz")
+        return response
+        
+    except Exception as e:
+        logging.error(f"Error exporting CBZ: {e}")
+        flash('Error exporting comic archive. Please try again.', 'error')
+        return redirect(url_for('view_comic', comic_id=comic_id))
+
+@app.route('/comic/<int:comic_id>/exports', methods=['POST'])
+@idempotent
+def queue_export(comic_id):
+    """Queue a PDF or character sheet export; poll its job, then fetch the download link"""
+    try:
+        comic = Comic.query.get_or_404(comic_id)
+        export = request.form.get('export', 'pdf')
+        preset = request.form.get('preset', DEFAULT_PDF_PRESET)
+        
+        if export == 'pdf':
+            error = None if preset in PDF_PRESETS else f'Unknown export preset "{preset}"'
+            if not error and not comic.panels:
+                error = 'No panels to export'
+            kind, payload = 'export_pdf', {'preset': preset}
+        elif export == 'character_sheet':
+            error = None if comic.get_characters_dict() else 'This comic has no characters to export'
+            kind, payload = 'export_character_sheet', {}
+        else:
+            error = f'Unknown export "{export}"'
+        
+        if error:
+            if _wants_json():
+                return jsonify({'error': error}), 400
+            flash(error, 'error')
+            return redirect(url_for('view_comic', comic_id=comic_id))
+        
+        job = enqueue_job(kind, payload, comic_id=comic.id)
+        
+        if _wants_json():
+            return jsonify({
+                'job_id': job.id,
+                'status_url': url_for('job_status', job_id=job.id),
+                'download_url': url_for('download_export', job_id=job.id)
+            }), 202
+        
+        flash('Your export is being prepared.', 'info')
+        return redirect(url_for('view_comic', comic_id=comic_id))
+        
+    except Exception as e:
+        logging.error(f"Error queueing export: {e}")
+        db.session.rollback()
+        if _wants_json():
+            return jsonify({'error': 'Error starting export. Please try again.'}), 500
+        flash('Error starting export. Please try again.', 'error')
+        return redirect(url_for('view_comic', comic_id=comic_id))
+
+@app.route('/exports/<int:job_id>/download')
+def download_export(job_id):
+    """Download the file produced by a finished export job"""
+    job = get_job(job_id)
+    if job is None or job.kind not in EXPORT_JOB_KINDS:
+        abort(404)
+    if not job.is_finished:
+        response = jsonify(job.to_dict())
+        response.status_code = 202
+        response.headers['Retry-After'] = '2'
+        return response
+    
+    result = job.get_result()
+    if job.status != 'done' or not get_storage().exists(result.get('path') or ''):
+        # Failed, or the export was since removed by the asset GC
+        abort(404)
+    return _send_asset(result['path'], as_attachment=True, download_name=result.get('download_name'))
+
+@app.route('/comic/<int:comic_id>/export_audiobook')
+def export_audiobook(comic_id):
+    """Export all panel narrations as one MP3 with a chapter per panel"""
+    try:
+        comic = Comic.query.get_or_404(comic_id)
+        # Audio for narration that has since been edited is left out until it is regenerated
+        panels = Panel.query.filter(Panel.comic_id == comic_id, Panel.audio_path.isnot(None),
+                                    Panel.audio_outdated.isnot(True)) \
+            .order_by(Panel.panel_number).all()
+        
+        if not panels:
+            flash('No narrated panels to export', 'error')
+            return redirect(url_for('view_comic', comic_id=comic_id))
+        
+        download_name = f"{comic.title}.mp3"
+        path = audiobook_path(comic, panels)
+        if get_storage().exists(path):
+            return _send_asset(path, as_attachment=True, download_name=download_name)
+        
+        tag, audio_paths, length = plan_audiobook(comic, panels)
+        if not audio_paths:
+            flash('Narration audio files are missing', 'error')
+            return redirect(url_for('view_comic', comic_id=comic_id))
+        
+        # Built while streaming; later requests for the same narrations get the stored file
+        response = Response(stream_with_context(stream_audiobook(tag, audio_paths, path)), mimetype='audio/mpeg')
+        response.headers['Content-Length'] = str(length)
+        response.headers['Content-Disposition'] = _attachment_disposition(download_name)
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
+        
+    except Exception as e:
+        logging.error(f"Error exporting audiobook: {e}")
+        flash('Error exporting audiobook. Please try again.', 'error')
+        return redirect(url_for('view_comic', comic_id=comic_id))
+
 @app.route('/panel/<int:panel_id>/delete', methods=['POST'])
 def delete_panel(panel_id):
     """Delete a specific panel"""
@@ -326,10 +774,7 @@ def delete_panel(panel_id):
         panel_number = panel.panel_number
         
         # Delete associated files
-        if panel.image_path and os.path.exists(panel.image_path):
-            os.remove(panel.image_path)
-        if panel.audio_path and os.path.exists(panel.audio_path):
-            os.remove(panel.audio_path)
+        _remove_panel_files([panel])
         
         # Delete the panel from database
         db.session.delete(panel)
@@ -350,11 +795,7 @@ def delete_comic(comic_id):
         comic = Comic.query.get_or_404(comic_id)
         
         # Delete associated files
-        for panel in comic.panels:
-            if panel.image_path and os.path.exists(panel.image_path):
-                os.remove(panel.image_path)
-            if panel.audio_path and os.path.exists(panel.audio_path):
-                os.remove(panel.audio_path)
+        _remove_panel_files(comic.panels)
         
         db.session.delete(comic)
         db.session.commit()
@@ -367,6 +808,18 @@ def delete_comic(comic_id):
         flash('Error deleting comic. Please try again.', 'error')
         return redirect(url_for('index'))
 
+@app.route('/metrics')
+def metrics():
+    """Report cache, outbound API and asset GC metrics as JSON"""
+    return jsonify({
+        'image_cache': image_cache.stats(),
+        'pdf_image_cache': pdf_image_cache.stats(),
+        'pdf_fragment_cache': pdf_fragment_cache.stats(),
+        'narration_cache': narration_cache.stats(),
+        'outbound': outbound_metrics(),
+        'asset_gc': last_asset_gc()
+    })
+
 @app.errorhandler(404)
 def not_found(error):
     return render_template('index.html', error="Page not found"), 404
@@ -0,0 +1,188 @@
+import os
+import time
+import logging
+import threading
+from datetime import datetime, timedelta
+import click
+from sqlalchemy import or_
+from app import app, db
+from models import Panel
+from services.storage import get_storage
+from utils.asset_files import asset_hash
+
+# Files younger than this are never collected, so assets written by a job
+# that has not committed its panel yet are safe
+ASSET_GC_GRACE_PERIOD = int(os.environ.get("ASSET_GC_GRACE_PERIOD", "3600"))
+ASSET_GC_INTERVAL = int(os.environ.get("ASSET_GC_INTERVAL", "3600"))  # 0 disables the sweeper
+EXPORT_TTL = int(os.environ.get("EXPORT_TTL", str(24 * 3600)))
+EXPORT_MAX_BYTES = int(os.environ.get("EXPORT_MAX_BYTES", str(500 * 1024 * 1024)))
+
+# Directories holding files referenced from panels; exports are never referenced
+PANEL_ASSET_PREFIXES = ('static/images/', 'static/audio/')
+EXPORT_PREFIX = 'static/exports/'
+
+_last_run = None
+_sweeper = None
+_sweeper_lock = threading.Lock()
+
+
+def asset_reference_count(path, excluded_panel_ids=None):
+    """
+    Count the panels referencing a (possibly shared) content-hashed file
+
+    Identical images and narration map to the same file, so several panels
+    can hold a reference to one asset.
+
+    Args:
+        path (str): Asset path
+        excluded_panel_ids (list): Panels to ignore, e.g. ones being deleted
+
+    Returns:
+        int: Number of referencing panels
+    """
+    query = Panel.query.filter(or_(
+        Panel.image_path == path,
+        Panel.audio_path == path,
+        Panel.image_variants.contains(path)
+    ))
+    if excluded_panel_ids:
+        query = query.filter(~Panel.id.in_(excluded_panel_ids))
+    return query.count()
+
+
+def asset_in_use(path, excluded_panel_ids=None):
+    """Whether any panel (other than the excluded ones) still references a file"""
+    return asset_reference_count(path, excluded_panel_ids) > 0
+
+
+def collect_garbage(dry_run=False):
+    """
+    Remove unreferenced assets, stale partial files and expired exports
+
+    Only content-hashed files and leftover ".tmp" files are considered, so
+    legacy and bundled files under static/ are never touched. Exports are
+    removed once older than EXPORT_TTL, then oldest first while the exports
+    directory is larger than EXPORT_MAX_BYTES.
+
+    Args:
+        dry_run (bool): Report what would be removed without deleting anything
+
+    Returns:
+        dict: Counts of scanned and removed files and the bytes reclaimed
+    """
+    global _last_run
+    storage = get_storage()
+    now = datetime.utcnow()
+    grace_cutoff = now - timedelta(seconds=ASSET_GC_GRACE_PERIOD)
+    report = {'scanned': 0, 'orphans': 0, 'partials': 0, 'exports': 0,
+              'reclaimed_bytes': 0, 'dry_run': dry_run}
+
+    def remove(key, size, reason):
+        if not dry_run:
+            try:
+                storage.delete(key)
+            except Exception as e:
+                logging.error(f"Error removing {key}: {e}")
+                return
+        report[reason] += 1
+        report['reclaimed_bytes'] += size
+        logging.info(f"Asset GC {'would remove' if dry_run else 'removed'} {key} ({reason[:-1]}, {size} bytes)")
+
+    # List first and check references afterwards, so a file cannot become
+    # referenced between the reference query and the listing
+    candidates = []
+    for prefix in PANEL_ASSET_PREFIXES:
+        for key, size, modified in storage.list(prefix):
+            report['scanned'] += 1
+            if modified > grace_cutoff:
+                continue
+            if key.endswith('.tmp'):
+                remove(key, size, 'partials')
+            elif asset_hash(key):
+                candidates.append((key, size))
+
+    referenced = _referenced_paths()
+    for key, size in candidates:
+        # Re-check right before deleting in case a panel or a running job picked
+        # the file up since; reusing an asset refreshes its modification time
+        if key in referenced or asset_in_use(key):
+            continue
+        modified = storage.modified(key)
+        if modified is not None and modified <= grace_cutoff:
+            remove(key, size, 'orphans')
+
+    exports = []
+    for key, size, modified in storage.list(EXPORT_PREFIX):
+        report['scanned'] += 1
+        if key.endswith('.tmp'):
+            if modified <= grace_cutoff:
+                remove(key, size, 'partials')
+        elif asset_hash(key):
+            exports.append((modified, key, size))
+
+    export_cutoff = now - timedelta(seconds=EXPORT_TTL)
+    kept_bytes = 0
+    for modified, key, size in sorted(exports, reverse=True):
+        if modified < export_cutoff or kept_bytes + size > EXPORT_MAX_BYTES:
+            remove(key, size, 'exports')
+        else:
+            kept_bytes += size
+
+    report['finished_at'] = datetime.utcnow().isoformat()
+    logging.info(f"Asset GC reclaimed {report['reclaimed_bytes']} bytes "
+                 f"({report['orphans']} orphans, {report['partials']} partials, {report['exports']} exports)")
+    if not dry_run:
+        _last_run = report
+    return report
+
+
+def last_run():
+    """Report of the most recent sweep in this process, or None"""
+    return _last_run
+
+
+def start_sweeper(interval=ASSET_GC_INTERVAL):
+    """
+    Run collect_garbage every `interval` seconds on a daemon thread
+
+    Args:
+        interval (int): Seconds between sweeps; 0 disables the sweeper
+    """
+    global _sweeper
+    if interval <= 0:
+        return
+    with _sweeper_lock:
+        if _sweeper is None:
+            _sweeper = threading.Thread(target=_sweep_forever, args=(interval,), name="asset-gc", daemon=True)
+            _sweeper.start()
+
+
+def _sweep_forever(interval):
+    while True:
+        time.sleep(interval)
+        with app.app_context():
+            try:
+                collect_garbage()
+            except Exception as e:
+                logging.error(f"Asset GC error: {e}")
+                db.session.rollback()
+            finally:
+                db.session.remove()
+
+
+def _referenced_paths():
+    """Every asset path recorded on any panel"""
+    referenced = set()
+    for panel in Panel.query.yield_per(500):
+        referenced.update(panel.asset_paths())
+    return referenced
+
+
+@app.cli.command('gc-assets')
+@click.option('--dry-run', is_flag=True, help='Only report what would be removed.')
+def gc_assets_command(dry_run):
+    """Remove orphaned generated files and expired exports."""
+    report = collect_garbage(dry_run=dry_run)
+    click.echo(f"Scanned {report['scanned']} files; "
+               f"{'would reclaim' if dry_run else 'reclaimed'} {report['reclaimed_bytes']} bytes "
+               f"({report['orphans']} orphans, {report['partials']} partials, {report['exports']} exports)")
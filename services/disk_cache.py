@@ -0,0 +1,148 @@
+import os
+import json
+import hashlib
+import logging
+import tempfile
+import threading
+
+
+class DiskCache:
+    """
+    Content-addressed byte cache on local disk with size-bounded LRU eviction
+
+    Entries are stored as one file per key; reads refresh the file's mtime so
+    eviction can drop the least recently used entries first.
+    """
+
+    def __init__(self, directory, max_bytes, name="cache"):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.name = name
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._size = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(*parts):
+        """Build a cache key from a hash of JSON-serialisable parts"""
+        encoded = json.dumps(parts, sort_keys=True, default=str).encode('utf-8')
+        return hashlib.sha256(encoded).hexdigest()
+
+    def get(self, key, record_stats=True):
+        """
+        Return cached bytes for a key, or None on a miss
+
+        Args:
+            key (str): Cache key from make_key
+            record_stats (bool): Count this lookup in the hit/miss counters
+
+        Returns:
+            bytes: Cached data, or None if not cached
+        """
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            os.utime(path)
+        except FileNotFoundError:
+            self._record(hit=False, enabled=record_stats)
+            return None
+        except OSError as e:
+            logging.error(f"Error reading {self.name} entry {key}: {e}")
+            self._record(hit=False, enabled=record_stats)
+            return None
+
+        self._record(hit=True, enabled=record_stats)
+        logging.info(f"{self.name} hit for {key[:12]}")
+        return data
+
+    def put(self, key, data):
+        """
+        Store bytes under a key and evict old entries if over the size limit
+
+        Args:
+            key (str): Cache key from make_key
+            data (bytes): Data to cache
+        """
+        if not data or len(data) > self.max_bytes:
+            return
+
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logging.error(f"Error writing {self.name} entry {key}: {e}")
+            return
+
+        with self._lock:
+            if self._size is None:
+                self._size = self._scan_size()
+            else:
+                self._size += len(data)
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def stats(self):
+        """Return hit/miss counters and current size"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+                'size_bytes': self._size if self._size is not None else self._scan_size(),
+                'max_bytes': self.max_bytes,
+            }
+
+    def _record(self, hit, enabled):
+        if not enabled:
+            return
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key)
+
+    def _entries(self):
+        for root, _, files in os.walk(self.directory):
+            for filename in files:
+                if filename.endswith('.tmp'):
+                    continue
+                path = os.path.join(root, filename)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                yield path, stat.st_size, stat.st_mtime
+
+    def _scan_size(self):
+        return sum(size for _, size, _ in self._entries())
+
+    def _evict(self):
+        """Remove least recently used entries until the cache is below 90% of its limit"""
+        entries = sorted(self._entries(), key=lambda entry: entry[2])
+        size = sum(entry[1] for entry in entries)
+        target = int(self.max_bytes * 0.9)
+
+        for path, entry_size, _ in entries:
+            if size <= target:
+                break
+            try:
+                os.remove(path)
+                size -= entry_size
+                self.evictions += 1
+            except OSError:
+                continue
+
+        self._size = size
+        logging.info(f"{self.name} evicted down to {size} bytes")
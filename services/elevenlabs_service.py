@@ -1,7 +1,56 @@
 import os
+import re
 import logging
+import tempfile
+import threading
 import requests
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from services.outbound import get_provider, RetryableError, RETRYABLE_STATUS
+from services.disk_cache import DiskCache
+from services.single_flight import SingleFlight, file_lock
+from services.voice_catalog import VoiceCatalog
+from utils.asset_files import write_asset, finalize_asset
+from utils.mp3_frames import concat_mp3
+
+# Connections to ElevenLabs are pooled and kept alive across calls and threads
+ELEVENLABS_POOL_SIZE = int(os.environ.get("ELEVENLABS_POOL_SIZE", "10"))
+ELEVENLABS_CONNECT_TIMEOUT = float(os.environ.get("ELEVENLABS_CONNECT_TIMEOUT", "5"))
+ELEVENLABS_READ_TIMEOUT = float(os.environ.get("ELEVENLABS_READ_TIMEOUT", "30"))
+ELEVENLABS_VOICES_TIMEOUT = float(os.environ.get("ELEVENLABS_VOICES_TIMEOUT", "10"))
+ELEVENLABS_STREAM_CHUNK_SIZE = int(os.environ.get("ELEVENLABS_STREAM_CHUNK_SIZE", str(16 * 1024)))
+
+# Narrations longer than this are split at sentence boundaries and the
+# chunks synthesised in parallel; 0 always sends the whole text at once
+NARRATION_CHUNK_THRESHOLD = int(os.environ.get("NARRATION_CHUNK_THRESHOLD", "600"))
+NARRATION_CHUNK_CONCURRENCY = int(os.environ.get("NARRATION_CHUNK_CONCURRENCY", "3"))
+NARRATION_MIN_CHUNK_CHARS = 40
+NARRATION_MAX_CHUNK_CHARS = 1000
+
+# The voice list is cached per process and refreshed in the background once stale
+VOICE_CATALOG_TTL = int(os.environ.get("VOICE_CATALOG_TTL", "3600"))
+VOICE_CATALOG_PATH = os.environ.get("VOICE_CATALOG_PATH", "instance/cache/voices.json")  # empty disables persistence
+
+DEFAULT_VOICE_ID = "21m00Tcm4TlvDq8ikWAM"  # Default voice (Rachel)
+
+_SENTENCE_BREAK = re.compile(r'(?<=[.!?…])\s+|(?<=[.!?…]["\'”’)\]])\s+')
+
+# Synthesised audio keyed by text, voice, model and voice settings so repeated lines skip the API
+narration_cache = DiskCache(
+    os.getenv("NARRATION_CACHE_DIR", "instance/cache/narration"),
+    int(os.getenv("NARRATION_CACHE_MAX_BYTES", str(200 * 1024 * 1024))),
+    name="Narration cache"
+)
+
+# Identical concurrent narration requests share one synthesis call
+narration_flight = SingleFlight("Narration synthesis")
+
+# Narrations currently being streamed, by cache key
+_streams = {}
+_streams_lock = threading.Lock()
+
+_session = None
+_session_lock = threading.Lock()
 
 def generate_narration_audio(text, panel_id):
     """
@@ -9,7 +58,7 @@ def generate_narration_audio(text, panel_id):
     
     Args:
         text (str): Text to convert to speech
-        panel_id (int): Panel ID for file naming
+        panel_id (int): Panel ID for logging
     
     Returns:
         str: Path to the generated audio file, or None if failed
@@ -22,48 +71,20 @@ def generate_narration_audio(text, panel_id):
             return None
         
         # ElevenLabs API configuration
-        voice_id = "21m00Tcm4TlvDq8ikWAM"  # Default voice (Rachel)
-        url = f"https://api.elevenlabs.io/v1/text-to-speech/{voice_id}"
-        
-        headers = {
-            "Accept": "audio/mpeg",
-            "Content-Type": "application/json",
-            "xi-api-key": api_key
-        }
-        
-        data = {
-            "text": text,
-            "model_id": "eleven_monolingual_v1",
-            "voice_settings": {
-                "stability": 0.5,
-                "similarity_boost": 0.5,
-                "style": 0.0,
-                "use_speaker_boost": True
-            }
-        }
+        headers, data = _narration_request(text, api_key)
         
         logging.info(f"Generating audio for panel {panel_id}: {text[:50]}...")
         
-        # Make request to ElevenLabs
-        response = requests.post(url, json=data, headers=headers, timeout=30)
-        
-        if response.status_code == 200:
-            # Ensure audio directory exists
-            os.makedirs("static/audio", exist_ok=True)
-            
-            # Generate unique filename
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            audio_path = f"static/audio/narration_{panel_id}_{timestamp}.mp3"
-            
-            # Save audio file
-            with open(audio_path, 'wb') as f:
-                f.write(response.content)
-            
-            logging.info(f"Audio saved as {audio_path}")
-            return audio_path
-        else:
-            logging.error(f"ElevenLabs API error: {response.status_code} - {response.text}")
+        # Synthesise, or reuse cached audio for an identical request
+        audio_data = _synthesize_narration(DEFAULT_VOICE_ID, headers, data)
+        if not audio_data:
             return None
+        
+        # Save audio file under a content-hash name
+        audio_path = write_asset("static/audio", "narration", audio_data, "mp3")
+        
+        logging.info(f"Audio saved as {audio_path}")
+        return audio_path
             
     except requests.exceptions.Timeout:
         logging.error("ElevenLabs API timeout")
@@ -75,34 +96,249 @@ def generate_narration_audio(text, panel_id):
         logging.error(f"Error generating audio: {e}")
         return None
 
+def generate_streamed_narration_audio(text, panel_id):
+    """
+    Generate narration through the ElevenLabs streaming endpoint and wait for it to be stored
+    
+    Listeners of stream_narration_audio for the same text hear the audio as
+    it arrives instead of waiting for this call.
+    
+    Args:
+        text (str): Text to convert to speech
+        panel_id (int): Panel ID for logging
+    
+    Returns:
+        str: Path to the generated audio file, or None if failed
+    """
+    api_key = os.environ.get("ELEVENLABS_API_KEY")
+    if not api_key:
+        logging.warning("No ELEVENLABS_API_KEY found, skipping audio generation")
+        return None
+    
+    headers, data = _narration_request(text, api_key)
+    cache_key = narration_cache_key(DEFAULT_VOICE_ID, data)
+    cached = narration_cache.get(cache_key)
+    if cached:
+        return write_asset("static/audio", "narration", cached, "mp3")
+    
+    stream, _ = _join_stream(cache_key, headers, data, panel_id)
+    return stream.wait()
+
+def stream_narration_audio(text, panel_id, on_complete=None):
+    """
+    Yield a narration's audio as the ElevenLabs streaming endpoint produces it
+    
+    Synthesis runs on a background thread that writes into a temporary
+    file, and this generator only follows that file, so a listener that
+    stops early does not cut off the paid call: the audio is still cached
+    and stored. Once it is stored on_complete is called with its path.
+    
+    Concurrent requests for the same narration in this process follow one
+    ElevenLabs call; other worker processes wait for it and then read the
+    narration cache.
+    
+    Args:
+        text (str): Text to convert to speech
+        panel_id (int): Panel ID for logging
+        on_complete (callable): Called with the stored audio path
+    
+    Yields:
+        bytes: MP3 data chunks
+    """
+    api_key = os.environ.get("ELEVENLABS_API_KEY")
+    if not api_key:
+        logging.warning("No ELEVENLABS_API_KEY found, skipping audio generation")
+        return
+    
+    headers, data = _narration_request(text, api_key)
+    cache_key = narration_cache_key(DEFAULT_VOICE_ID, data)
+    cached = narration_cache.get(cache_key)
+    if cached:
+        yield from _chunked(cached)
+        audio_path = write_asset("static/audio", "narration", cached, "mp3")
+        if on_complete:
+            on_complete(audio_path)
+        return
+    
+    stream, source = _join_stream(cache_key, headers, data, panel_id, follow=True)
+    with source:
+        yield from stream.follow(source)
+    if stream.audio_path and on_complete:
+        on_complete(stream.audio_path)
+
+def _join_stream(cache_key, headers, data, panel_id, follow=False):
+    """
+    Return the in-flight stream for a narration, starting its synthesis if there is none
+    
+    With follow=True the stream's temporary file is also opened for reading
+    while the stream is still registered, before it can be moved into storage.
+    
+    Returns:
+        tuple: (_NarrationStream, readable file object or None)
+    """
+    with _streams_lock:
+        stream = _streams.get(cache_key)
+        if stream is None:
+            fd, tmp_path = tempfile.mkstemp(suffix=".mp3.tmp")
+            stream = _streams[cache_key] = _NarrationStream(tmp_path)
+            threading.Thread(target=_produce_stream, args=(stream, fd, cache_key, headers, data, panel_id),
+                             name=f"narration-stream-{panel_id}", daemon=True).start()
+        else:
+            logging.info(f"Panel {panel_id} narration joins an in-flight stream")
+        source = open(stream.tmp_path, 'rb') if follow else None
+    return stream, source
+
+def _produce_stream(stream, fd, cache_key, headers, data, panel_id):
+    """Drain a streamed narration into its temporary file, then cache and store it"""
+    audio_path = None
+    try:
+        if _download_stream(stream, fd, cache_key, headers, data, panel_id):
+            # Cached before the stream is unregistered, so later requests never call the API again
+            with _streams_lock:
+                _streams.pop(cache_key, None)
+            audio_path = finalize_asset(stream.tmp_path, "static/audio", "narration", "mp3")
+            logging.info(f"Streamed audio saved as {audio_path}")
+    except Exception as e:
+        logging.error(f"Error streaming audio: {e}")
+    finally:
+        with _streams_lock:
+            if _streams.get(cache_key) is stream:
+                del _streams[cache_key]
+        if audio_path is None and os.path.exists(stream.tmp_path):
+            os.remove(stream.tmp_path)
+        stream.finish(audio_path)
+
+def _download_stream(stream, fd, cache_key, headers, data, panel_id):
+    """
+    Write a narration into the stream's temporary file and the narration cache
+    
+    Returns:
+        bool: True once the whole narration is written and cached
+    """
+    url = f"https://api.elevenlabs.io/v1/text-to-speech/{DEFAULT_VOICE_ID}/stream"
+    response = None
+    # Other worker processes streaming the same text wait here, then hit the cache
+    with os.fdopen(fd, 'wb') as f, file_lock(cache_key):
+        try:
+            cached = narration_cache.get(cache_key, record_stats=False)
+            if cached:
+                chunks = _chunked(cached)
+            else:
+                logging.info(f"Streaming audio for panel {panel_id}: {data['text'][:50]}...")
+                response = _send('post', url, json=data, headers=headers, stream=True,
+                                 timeout=(ELEVENLABS_CONNECT_TIMEOUT, ELEVENLABS_READ_TIMEOUT))
+                if response.status_code != 200:
+                    logging.error(f"ElevenLabs API error: {response.status_code} - {response.text}")
+                    return False
+                chunks = response.iter_content(chunk_size=ELEVENLABS_STREAM_CHUNK_SIZE)
+            
+            for chunk in chunks:
+                if chunk:
+                    f.write(chunk)
+                    f.flush()
+                    stream.append(len(chunk))
+        finally:
+            if response is not None:
+                response.close()
+        
+        if not cached:
+            with open(stream.tmp_path, 'rb') as audio_file:
+                narration_cache.put(cache_key, audio_file.read())
+    return True
+
+
+class _NarrationStream:
+    """A narration being streamed into a temporary file, which concurrent requests can follow"""
+    
+    def __init__(self, tmp_path):
+        self.tmp_path = tmp_path
+        self.written = 0
+        self.finished = False
+        self.audio_path = None
+        self._condition = threading.Condition()
+    
+    def append(self, size):
+        with self._condition:
+            self.written += size
+            self._condition.notify_all()
+    
+    def finish(self, audio_path):
+        """Mark the stream done; audio_path is None if it failed"""
+        with self._condition:
+            self.finished = True
+            self.audio_path = audio_path
+            self._condition.notify_all()
+    
+    def wait(self):
+        """Block until the stream is done and return its stored audio path, or None"""
+        with self._condition:
+            while not self.finished:
+                self._condition.wait()
+            return self.audio_path
+    
+    def follow(self, source):
+        """Yield what the leader writes to the temporary file until it finishes"""
+        position = 0
+        while True:
+            with self._condition:
+                while position >= self.written and not self.finished:
+                    self._condition.wait()
+                available = self.written - position
+            if not available:
+                return
+            data = source.read(available)
+            if not data:
+                return
+            position += len(data)
+            yield data
+
+
+def _chunked(data):
+    for offset in range(0, len(data), ELEVENLABS_STREAM_CHUNK_SIZE):
+        yield data[offset:offset + ELEVENLABS_STREAM_CHUNK_SIZE]
+
 def get_available_voices():
     """
     Get list of available voices from ElevenLabs
     
+    Served from the cached voice catalogue; the API is only called when the
+    cache is cold or, in the background, once it is older than VOICE_CATALOG_TTL.
+    
     Returns:
         list: List of voice dictionaries, or empty list if failed
     """
+    return voice_catalog.voices()
+
+def _fetch_voices():
+    """
+    Fetch the voice list from the ElevenLabs API
+    
+    Returns:
+        list: Voice dictionaries, or None if the request failed
+    """
     try:
         api_key = os.environ.get("ELEVENLABS_API_KEY")
         
         if not api_key:
-            return []
+            return None
         
         url = "https://api.elevenlabs.io/v1/voices"
         headers = {"xi-api-key": api_key}
         
-        response = requests.get(url, headers=headers, timeout=10)
+        response = _send('get', url, headers=headers, timeout=(ELEVENLABS_CONNECT_TIMEOUT, ELEVENLABS_VOICES_TIMEOUT))
         
         if response.status_code == 200:
             voices_data = response.json()
             return voices_data.get("voices", [])
         else:
             logging.error(f"Error fetching voices: {response.status_code}")
-            return []
+            return None
             
     except Exception as e:
         logging.error(f"Error getting available voices: {e}")
-        return []
+        return None
+
+voice_catalog = VoiceCatalog(_fetch_voices, VOICE_CATALOG_TTL, VOICE_CATALOG_PATH or None)
 
 def generate_audio_with_voice(text, voice_id, panel_id):
     """
@@ -111,7 +347,7 @@ def generate_audio_with_voice(text, voice_id, panel_id):
     Args:
         text (str): Text to convert to speech
         voice_id (str): ElevenLabs voice ID
-        panel_id (int): Panel ID for file naming
+        panel_id (int): Panel ID for logging
     
     Returns:
         str: Path to the generated audio file, or None if failed
@@ -122,8 +358,6 @@ def generate_audio_with_voice(text, voice_id, panel_id):
         if not api_key:
             return None
         
-        url = f"https://api.elevenlabs.io/v1/text-to-speech/{voice_id}"
-        
         headers = {
             "Accept": "audio/mpeg",
             "Content-Type": "application/json",
@@ -139,21 +373,184 @@ def generate_audio_with_voice(text, voice_id, panel_id):
             }
         }
         
-        response = requests.post(url, json=data, headers=headers, timeout=30)
+        logging.info(f"Generating audio for panel {panel_id} with voice {voice_id}: {text[:50]}...")
         
-        if response.status_code == 200:
-            os.makedirs("static/audio", exist_ok=True)
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            audio_path = f"static/audio/narration_{panel_id}_{timestamp}.mp3"
-            
-            with open(audio_path, 'wb') as f:
-                f.write(response.content)
-            
-            return audio_path
-        else:
-            logging.error(f"ElevenLabs API error: {response.status_code}")
+        audio_data = _synthesize_narration(voice_id, headers, data)
+        if not audio_data:
             return None
+        return write_asset("static/audio", "narration", audio_data, "mp3")
             
     except Exception as e:
         logging.error(f"Error generating audio with voice: {e}")
         return None
+
+
+def split_narration(text, min_chars=NARRATION_MIN_CHUNK_CHARS, max_chars=NARRATION_MAX_CHUNK_CHARS):
+    """
+    Split narration into sentence chunks for separate synthesis
+    
+    Each sentence is its own chunk so that editing one sentence leaves the
+    other chunks (and their cached audio) unchanged. Very short sentences
+    are joined to the next one, and sentences over max_chars are split at
+    a word boundary.
+    
+    Args:
+        text (str): Narration text
+        min_chars (int): Sentences shorter than this are merged forward
+        max_chars (int): Hard limit on chunk length
+    
+    Returns:
+        list: Text chunks in reading order
+    """
+    chunks = []
+    pending = ""
+    for sentence in _SENTENCE_BREAK.split(text.strip()):
+        sentence = f"{pending} {sentence}".strip() if pending else sentence.strip()
+        if not sentence:
+            continue
+        if len(sentence) < min_chars:
+            pending = sentence
+            continue
+        pending = ""
+        while len(sentence) > max_chars:
+            cut = sentence.rfind(' ', 0, max_chars)
+            cut = cut if cut > 0 else max_chars
+            chunks.append(sentence[:cut].strip())
+            sentence = sentence[cut:].strip()
+        chunks.append(sentence)
+    if pending:
+        if chunks and len(chunks[-1]) + len(pending) < max_chars:
+            chunks[-1] = f"{chunks[-1]} {pending}"
+        else:
+            chunks.append(pending)
+    return chunks
+
+
+def narration_cache_key(voice_id, data):
+    """Cache key for a synthesis request: its text, voice, model and voice settings"""
+    return DiskCache.make_key(data["text"], voice_id, data["model_id"], data["voice_settings"])
+
+
+def _synthesize(voice_id, headers, data):
+    """
+    Return MP3 bytes for a text-to-speech request, from the narration cache when possible
+    
+    Returns:
+        bytes: Audio data, or None if ElevenLabs returned an error
+    """
+    cache_key = narration_cache_key(voice_id, data)
+    cached = narration_cache.get(cache_key)
+    if cached:
+        return cached
+    
+    # Identical concurrent requests in this process share one synthesis
+    return narration_flight.do(cache_key, _synthesize_uncached, voice_id, headers, data, cache_key)
+
+
+def _synthesize_narration(voice_id, headers, data):
+    """
+    Synthesise a narration, splitting long text into parallel sentence chunks
+    
+    Chunks are synthesised (and cached) independently with bounded
+    parallelism, then their MP3 frames are joined without re-encoding.
+    
+    Returns:
+        bytes: Audio data, or None if any chunk failed
+    """
+    text = data["text"]
+    chunks = split_narration(text) if NARRATION_CHUNK_THRESHOLD and len(text) > NARRATION_CHUNK_THRESHOLD else [text]
+    if len(chunks) < 2:
+        return _synthesize(voice_id, headers, data)
+    
+    logging.info(f"Synthesising narration in {len(chunks)} chunks")
+    chunk_requests = [dict(data, text=chunk) for chunk in chunks]
+    with ThreadPoolExecutor(max_workers=min(NARRATION_CHUNK_CONCURRENCY, len(chunks))) as executor:
+        parts = list(executor.map(lambda chunk_data: _synthesize(voice_id, headers, chunk_data), chunk_requests))
+    
+    if not all(parts):
+        logging.error(f"{parts.count(None)} of {len(parts)} narration chunks failed")
+        return None
+    return concat_mp3(parts)
+
+
+def _synthesize_uncached(voice_id, headers, data, cache_key):
+    url = f"https://api.elevenlabs.io/v1/text-to-speech/{voice_id}"
+    response = _send('post', url, json=data, headers=headers,
+                     timeout=(ELEVENLABS_CONNECT_TIMEOUT, ELEVENLABS_READ_TIMEOUT))
+    
+    if response.status_code != 200:
+        logging.error(f"ElevenLabs API error: {response.status_code} - {response.text}")
+        return None
+    
+    narration_cache.put(cache_key, response.content)
+    return response.content
+
+
+def _narration_request(text, api_key):
+    """Headers and body for a default-voice narration request"""
+    headers = {
+        "Accept": "audio/mpeg",
+        "Content-Type": "application/json",
+        "xi-api-key": api_key
+    }
+    
+    data = {
+        "text": text,
+        "model_id": "eleven_monolingual_v1",
+        "voice_settings": {
+            "stability": 0.5,
+            "similarity_boost": 0.5,
+            "style": 0.0,
+            "use_speaker_boost": True
+        }
+    }
+    return headers, data
+
+
+def _get_session():
+    """
+    Return the shared pooled session, created on first use
+    
+    The connection pool is thread-safe, so job threads and request handlers
+    reuse the same keep-alive connections instead of a new TLS handshake per call.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                # Retries are handled by the outbound provider, not urllib3
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=ELEVENLABS_POOL_SIZE, max_retries=0)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session = session
+    return _session
+
+
+def _send(method, url, **kwargs):
+    """
+    Send a request through the shared ElevenLabs rate limiter, retry policy and circuit breaker
+    
+    Throttling and server errors are retried; if they persist the last
+    response is returned so callers can log it as before.
+    
+    Returns:
+        requests.Response: Final response from ElevenLabs
+    """
+    def attempt():
+        response = _get_session().request(method, url, **kwargs)
+        if response.status_code in RETRYABLE_STATUS:
+            raise RetryableError(
+                f"ElevenLabs API error: {response.status_code}",
+                status_code=response.status_code,
+                retry_after=response.headers.get('Retry-After'),
+                response=response
+            )
+        return response
+    
+    try:
+        return get_provider('elevenlabs').call(attempt)
+    except RetryableError as e:
+        if e.response is not None:
+            return e.response
+        raise
@@ -0,0 +1,66 @@
+import logging
+from app import db
+from models import Comic, Panel
+from services.job_queue import job_handler, JobError
+from utils.pdf_generator import create_comic_pdf, create_character_sheet_pdf, DEFAULT_PDF_PRESET, PDF_PRESETS
+
+# Job kinds whose result is a file offered for download
+EXPORT_JOB_KINDS = ('export_pdf', 'export_character_sheet')
+
+
+@job_handler('export_pdf')
+def export_pdf_job(job):
+    """Build a comic PDF in the background, reporting per-panel progress"""
+    comic = _get_comic(job)
+    panels = Panel.query.filter_by(comic_id=comic.id).order_by(Panel.panel_number).all()
+    if not panels:
+        raise JobError('No panels to export')
+
+    preset = job.get_payload().get('preset', DEFAULT_PDF_PRESET)
+    if preset not in PDF_PRESETS:
+        raise JobError(f'Unknown export preset "{preset}"')
+
+    title = comic.title
+    progress = {'stage': 'queued', 'total': len(panels), 'completed': 0}
+
+    def report(stage, completed, total):
+        progress.update(stage=stage, completed=completed, total=total)
+        job.set_result(progress)
+        db.session.commit()
+
+    pdf_path = create_comic_pdf(comic, panels, preset, on_progress=report)
+    if not pdf_path:
+        raise JobError('Error creating PDF')
+
+    download_name = f"{title}.pdf" if preset == DEFAULT_PDF_PRESET else f"{title} ({preset}).pdf"
+    progress.update(stage='done', completed=progress['total'], path=pdf_path, download_name=download_name)
+    logging.info(f"Export job {job.id} produced {pdf_path}")
+    return progress
+
+
+@job_handler('export_character_sheet')
+def export_character_sheet_job(job):
+    """Build a comic's character sheet PDF in the background"""
+    comic = _get_comic(job)
+    characters = comic.get_characters_dict()
+    if not characters:
+        raise JobError('This comic has no characters to export')
+
+    pdf_path = create_character_sheet_pdf(comic)
+    if not pdf_path:
+        raise JobError('Error creating character sheet')
+
+    return {
+        'stage': 'done',
+        'total': len(characters),
+        'completed': len(characters),
+        'path': pdf_path,
+        'download_name': f"{comic.title} - Characters.pdf"
+    }
+
+
+def _get_comic(job):
+    comic = db.session.get(Comic, job.comic_id) if job.comic_id else None
+    if comic is None:
+        raise JobError('Comic no longer exists')
+    return comic
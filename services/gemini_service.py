@@ -1,46 +1,44 @@
+import io
 import os
 import logging
 import json
-from datetime import datetime
-from google import genai
-from google.genai import types
 from dotenv import load_dotenv
+from services.disk_cache import DiskCache
+from services.image_backends import get_image_backend, render_placeholder
+from services.single_flight import SingleFlight, file_lock
+from utils.image_ingest import ingest_image
+from utils.character_index import as_character_index
 
 load_dotenv()
 
-# Read API key
-api_key = os.getenv("GEMINI_API_KEY")
-if not api_key:
-    raise ValueError("❌ GEMINI_API_KEY not found. Please add it to your .env file.")
-
-# Initialize Gemini client
-client = genai.Client(api_key=api_key)
+# Generated images keyed by prompt, model and config so identical requests skip the API
+image_cache = DiskCache(
+    os.getenv("IMAGE_CACHE_DIR", "instance/cache/images"),
+    int(os.getenv("IMAGE_CACHE_MAX_BYTES", str(500 * 1024 * 1024))),
+    name="Image cache"
+)
+image_flight = SingleFlight("Image generation")
 
 
 def generate_comic_panel(scene_description, characters, style="realistic", panel_number=1):
     """
-    Generate a comic panel using Gemini 2.0 Flash Image Generation
+    Generate a comic panel using the configured image backend (Gemini by default)
     
     Args:
         scene_description (str): Description of the scene to generate
-        characters (dict): Character definitions for consistency
+        characters (dict or CharacterIndex): Character definitions for consistency
         style (str): Art style for the comic
-        panel_number (int): Panel number for file naming
+        panel_number (int): Panel number for logging
     
     Returns:
-        str: Path to the generated image file, or None if failed
+        IngestedImage: Path, dimensions and size of the stored image, or None if failed
     """
     try:
         # Create detailed character context only for mentioned characters
         character_context = ""
         if characters:
             # Extract character names mentioned in the scene description
-            mentioned_characters = {}
-            scene_lower = scene_description.lower()
-            
-            for name, details in characters.items():
-                if name.lower() in scene_lower:
-                    mentioned_characters[name] = details
+            mentioned_characters = as_character_index(characters).mentioned(scene_description)
             
             if mentioned_characters:
                 character_context = "\nCHARACTER CONSISTENCY REQUIREMENTS:\n"
@@ -67,43 +65,15 @@ def generate_comic_panel(scene_description, characters, style="realistic", panel
         
         logging.info(f"Generating panel {panel_number} with prompt: {prompt[:100]}...")
         
-        # Ensure static directory exists
-        os.makedirs("static/images", exist_ok=True)
-        
-        # Generate unique filename
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        image_path = f"static/images/panel_{panel_number}_{timestamp}.jpg"
-        
         # Call Gemini image generation
-        response = client.models.generate_content(
-            model="gemini-2.5-flash-image-preview",
-            contents=prompt,
-            config=types.GenerateContentConfig(
-                response_modalities=['TEXT', 'IMAGE']
-            )
-        )
-        
-        if not response.candidates:
-            logging.error("No candidates returned from Gemini")
+        image_data = _generate_image_bytes(prompt)
+        if not image_data:
             return None
         
-        content = response.candidates[0].content
-        if not content or not content.parts:
-            logging.error("No content parts in response")
-            return None
-        
-        # Save the generated image
-        for part in content.parts:
-            if part.inline_data and part.inline_data.data:
-                with open(image_path, 'wb') as f:
-                    f.write(part.inline_data.data)
-                logging.info(f"Panel saved as {image_path}")
-                return image_path
-            elif part.text:
-                logging.info(f"Generated description: {part.text}")
-        
-        logging.error("No image data found in response")
-        return None
+        # Re-encode and save the generated image under a content-hash name
+        image = ingest_image("static/images", "panel", image_data)
+        logging.info(f"Panel saved as {image.path}")
+        return image
         
     except Exception as e:
         logging.error(f"Error generating panel: {e}")
@@ -121,18 +91,24 @@ def edit_panel_with_instruction(current_image_path, edit_instruction, original_d
         current_image_path (str): Path to current panel image
         edit_instruction (str): Natural language editing instruction
         original_description (str): Original scene description
-        characters (dict): Character definitions for consistency
+        characters (dict or CharacterIndex): Character definitions for consistency
         style (str): Art style for the comic
     
     Returns:
-        str: Path to the edited image file, or None if failed
+        IngestedImage: Path, dimensions and size of the edited image, or None if failed
     """
     try:
         # Create detailed character context for consistency
         character_context = ""
         if characters:
+            # Prefer characters named in the scene or instruction, else keep all of them
+            character_index = as_character_index(characters)
+            mentioned_characters = character_index.mentioned(original_description, edit_instruction)
+            if not mentioned_characters:
+                mentioned_characters = dict(character_index.items())
+            
             character_context = "\nCHARACTER CONSISTENCY REQUIREMENTS:\n"
-            for name, details in characters.items():
+            for name, details in mentioned_characters.items():
                 desc = details.get('description', '')
                 character_context += f"- {name}: {desc}\n"
             character_context += "\nIMPORTANT: Maintain exact visual consistency for all named characters.\n"
@@ -156,82 +132,61 @@ def edit_panel_with_instruction(current_image_path, edit_instruction, original_d
         
         logging.info(f"Editing panel with instruction: {edit_instruction}")
         
-        # Ensure static directory exists
-        os.makedirs("static/images", exist_ok=True)
-        
-        # Generate new filename
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        new_image_path = f"static/images/edited_panel_{timestamp}.jpg"
-        
         # Call Gemini for editing (using image generation since editing isn't directly supported)
-        response = client.models.generate_content(
-            model="gemini-2.5-flash-image-preview",
-            contents=prompt,
-            config=types.GenerateContentConfig(
-                response_modalities=['TEXT', 'IMAGE']
-            )
-        )
-        
-        if not response.candidates:
-            return None
-        
-        content = response.candidates[0].content
-        if not content or not content.parts:
+        image_data = _generate_image_bytes(prompt)
+        if not image_data:
             return None
         
-        # Save the edited image
-        for part in content.parts:
-            if part.inline_data and part.inline_data.data:
-                with open(new_image_path, 'wb') as f:
-                    f.write(part.inline_data.data)
-                logging.info(f"Edited panel saved as {new_image_path}")
-                return new_image_path
-        
-        return None
+        # Re-encode and save the edited image under a content-hash name
+        image = ingest_image("static/images", "edited_panel", image_data)
+        logging.info(f"Edited panel saved as {image.path}")
+        return image
         
     except Exception as e:
         logging.error(f"Error editing panel: {e}")
         return None
 
+def _generate_image_bytes(prompt):
+    """
+    Generate image bytes for a prompt, reusing a cached result for identical requests
+    
+    Args:
+        prompt (str): Fully built generation prompt
+    
+    Returns:
+        bytes: Image data, or None if the backend returned no image
+    """
+    backend = get_image_backend()
+    cache_key = DiskCache.make_key(backend.model, prompt, backend.cache_config())
+    cached = image_cache.get(cache_key)
+    if cached:
+        return cached
+    
+    # Identical concurrent requests in this process share one generation
+    return image_flight.do(cache_key, _generate_uncached, backend, prompt, cache_key)
+
+def _generate_uncached(backend, prompt, cache_key):
+    """Generate under a cross-process lock, rechecking the cache another worker may have filled"""
+    with file_lock(cache_key):
+        cached = image_cache.get(cache_key, record_stats=False)
+        if cached:
+            return cached
+        
+        image_data = backend.generate(prompt)
+        if image_data:
+            image_cache.put(cache_key, image_data)
+        return image_data
+
 def _create_placeholder_image(panel_number, description):
     """Create a placeholder image when API is not available"""
-    from PIL import Image, ImageDraw, ImageFont
-    import textwrap
-    
     try:
-        # Create a simple placeholder image
-        img = Image.new('RGB', (800, 600), color='lightgray')
-        draw = ImageDraw.Draw(img)
-        
-        # Try to use a default font, fallback to basic if not available
-        try:
-            font = ImageFont.truetype("arial.ttf", 24)
-            small_font = ImageFont.truetype("arial.ttf", 16)
-        except:
-            font = ImageFont.load_default()
-            small_font = font
-        
-        # Draw panel border
-        draw.rectangle([10, 10, 790, 590], outline='black', width=3)
-        
-        # Draw title
-        draw.text((50, 50), f"Panel {panel_number}", fill='black', font=font)
-        
-        # Draw description (wrapped)
-        wrapped_text = textwrap.fill(description, width=60)
-        draw.text((50, 100), wrapped_text, fill='black', font=small_font)
-        
-        # Draw placeholder text
-        draw.text((50, 400), "Placeholder Image", fill='gray', font=font)
-        draw.text((50, 450), "(Add GEMINI_API_KEY to generate real images)", fill='gray', font=small_font)
+        img = render_placeholder(f"Panel {panel_number}", description,
+                                 footer="(Add GEMINI_API_KEY to generate real images)")
         
         # Save placeholder
-        os.makedirs("static/images", exist_ok=True)
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        placeholder_path = f"static/images/placeholder_{panel_number}_{timestamp}.jpg"
-        img.save(placeholder_path)
-        
-        return placeholder_path
+        buffer = io.BytesIO()
+        img.save(buffer, format='PNG')
+        return ingest_image("static/images", "placeholder", buffer.getvalue())
         
     except Exception as e:
         logging.error(f"Error creating placeholder image: {e}")
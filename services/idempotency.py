@@ -0,0 +1,118 @@
+import os
+import time
+import json
+import hashlib
+import logging
+from functools import wraps
+from datetime import datetime, timedelta
+from flask import request, redirect, flash, jsonify, make_response, Response
+from sqlalchemy.exc import IntegrityError
+from app import db
+from models import IdempotencyKey
+
+IDEMPOTENCY_TTL = int(os.environ.get("IDEMPOTENCY_TTL", str(24 * 3600)))
+IDEMPOTENCY_WAIT = float(os.environ.get("IDEMPOTENCY_WAIT", "60"))
+IDEMPOTENCY_POLL_INTERVAL = 0.25
+
+
+def idempotent(view):
+    """
+    Make a POST view safe to repeat with the same idempotency key
+
+    The key comes from an Idempotency-Key header or an idempotency_key form
+    field. The first request claims the key through a unique database row,
+    so concurrent duplicates on any worker wait for it to finish and then
+    receive the same response instead of repeating the work.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        key = request.headers.get('Idempotency-Key') or request.form.get('idempotency_key')
+        if not key:
+            return view(*args, **kwargs)
+
+        key = key.strip()[:100]
+        fingerprint = _request_fingerprint(kwargs)
+
+        _purge_expired()
+        db.session.add(IdempotencyKey(key=key, endpoint=request.endpoint, fingerprint=fingerprint))
+        try:
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            return _replay(key, fingerprint)
+
+        try:
+            response = make_response(view(*args, **kwargs))
+        except Exception:
+            db.session.rollback()
+            IdempotencyKey.query.filter_by(key=key).delete()
+            db.session.commit()
+            raise
+
+        _store_response(key, response)
+        return response
+
+    return wrapper
+
+
+def _request_fingerprint(view_args):
+    """Hash everything that identifies the request apart from the key itself"""
+    form = sorted((name, value) for name, value in request.form.items(multi=True) if name != 'idempotency_key')
+    parts = [request.endpoint, sorted(view_args.items()), form, request.get_data(as_text=True) if request.is_json else None]
+    return hashlib.sha256(json.dumps(parts, default=str).encode('utf-8')).hexdigest()
+
+
+def _store_response(key, response):
+    try:
+        record = IdempotencyKey.query.filter_by(key=key).first()
+        if record is None:
+            return
+        record.status = 'completed'
+        record.response_status = response.status_code
+        record.response_location = response.headers.get('Location')
+        if not record.response_location and response.mimetype == 'application/json':
+            record.response_body = response.get_data(as_text=True)
+            record.response_mimetype = response.mimetype
+        db.session.commit()
+    except Exception as e:
+        logging.error(f"Error storing idempotent response for {key}: {e}")
+        db.session.rollback()
+
+
+def _replay(key, fingerprint):
+    """Wait for the original request with this key to finish, then repeat its response"""
+    deadline = time.monotonic() + IDEMPOTENCY_WAIT
+    while True:
+        db.session.expire_all()
+        record = IdempotencyKey.query.filter_by(key=key).first()
+
+        if record is None:
+            # The original request failed and released the key
+            return _error_response('The original request failed. Please try again.', 409)
+        if record.fingerprint != fingerprint:
+            return _error_response('Idempotency key was already used for a different request.', 422)
+        if record.status == 'completed':
+            break
+        if time.monotonic() >= deadline:
+            return _error_response('The original request is still being processed.', 409)
+        time.sleep(IDEMPOTENCY_POLL_INTERVAL)
+
+    logging.info(f"Replaying response for idempotency key {key}")
+    if record.response_location:
+        if request.accept_mimetypes.best != 'application/json':
+            flash('This request was already submitted.', 'info')
+        return redirect(record.response_location, code=record.response_status)
+    return Response(record.response_body or '', status=record.response_status,
+                    mimetype=record.response_mimetype or 'application/json')
+
+
+def _error_response(message, status):
+    if request.is_json or request.accept_mimetypes.best == 'application/json':
+        return jsonify({'error': message}), status
+    flash(message, 'error')
+    return redirect(request.referrer or '/')
+
+
+def _purge_expired():
+    cutoff = datetime.utcnow() - timedelta(seconds=IDEMPOTENCY_TTL)
+    IdempotencyKey.query.filter(IdempotencyKey.created_at < cutoff).delete()
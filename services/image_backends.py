@@ -0,0 +1,181 @@
+import io
+import os
+import hashlib
+import logging
+import textwrap
+import threading
+from abc import ABC, abstractmethod
+from services.outbound import get_provider
+
+# "gemini", "local", or "auto" (Gemini when GEMINI_API_KEY is set, otherwise local)
+IMAGE_BACKEND = os.getenv("IMAGE_BACKEND", "auto")
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+class ImageBackend(ABC):
+    """Interface for services that turn a prompt into image bytes"""
+
+    name = "base"
+    model = None
+
+    def cache_config(self):
+        """Generation settings that affect the output, used in cache keys"""
+        return {}
+
+    @abstractmethod
+    def generate(self, prompt):
+        """
+        Generate an image for a prompt
+
+        Args:
+            prompt (str): Fully built generation prompt
+
+        Returns:
+            bytes: Encoded image data, or None if no image was produced
+        """
+
+
+class GeminiImageBackend(ImageBackend):
+    """Gemini image generation; the SDK client is created on first use"""
+
+    name = "gemini"
+    model = "gemini-2.5-flash-image-preview"
+    response_modalities = ['TEXT', 'IMAGE']
+
+    def __init__(self, api_key):
+        self.api_key = api_key
+        self._client = None
+        self._client_lock = threading.Lock()
+
+    @property
+    def client(self):
+        with self._client_lock:
+            if self._client is None:
+                from google import genai
+                self._client = genai.Client(api_key=self.api_key)
+            return self._client
+
+    def cache_config(self):
+        return {'response_modalities': self.response_modalities}
+
+    def generate(self, prompt):
+        from google.genai import types
+
+        response = get_provider('gemini').call(
+            self.client.models.generate_content,
+            model=self.model,
+            contents=prompt,
+            config=types.GenerateContentConfig(
+                response_modalities=self.response_modalities
+            )
+        )
+
+        if not response.candidates:
+            logging.error("No candidates returned from Gemini")
+            return None
+
+        content = response.candidates[0].content
+        if not content or not content.parts:
+            logging.error("No content parts in response")
+            return None
+
+        for part in content.parts:
+            if part.inline_data and part.inline_data.data:
+                return part.inline_data.data
+            elif part.text:
+                logging.info(f"Generated description: {part.text}")
+
+        logging.error("No image data found in response")
+        return None
+
+
+class LocalImageBackend(ImageBackend):
+    """Deterministic offline backend rendering the prompt onto a placeholder panel"""
+
+    name = "local"
+    model = "local-placeholder"
+
+    def generate(self, prompt):
+        digest = hashlib.sha256(prompt.encode('utf-8')).digest()
+        # Light background colour derived from the prompt so different panels are distinguishable
+        background = tuple(160 + value % 96 for value in digest[:3])
+        text = ' '.join(prompt.split())
+
+        img = render_placeholder("Local Preview", text, background=background,
+                                 footer="(Set IMAGE_BACKEND=gemini to generate real images)")
+        buffer = io.BytesIO()
+        img.save(buffer, format='JPEG', quality=85)
+        return buffer.getvalue()
+
+
+def render_placeholder(title, description, background='lightgray', footer=None):
+    """
+    Draw a bordered placeholder panel with a title and wrapped description
+
+    Args:
+        title (str): Heading text
+        description (str): Body text, wrapped and truncated to fit
+        background: PIL colour for the panel background
+        footer (str): Optional small print near the bottom
+
+    Returns:
+        PIL.Image.Image: Rendered 800x600 RGB image
+    """
+    from PIL import Image, ImageDraw, ImageFont
+
+    img = Image.new('RGB', (800, 600), color=background)
+    draw = ImageDraw.Draw(img)
+
+    # Try to use a default font, fallback to basic if not available
+    try:
+        font = ImageFont.truetype("arial.ttf", 24)
+        small_font = ImageFont.truetype("arial.ttf", 16)
+    except OSError:
+        font = ImageFont.load_default()
+        small_font = font
+
+    # Draw panel border
+    draw.rectangle([10, 10, 790, 590], outline='black', width=3)
+
+    # Draw title
+    draw.text((50, 50), title, fill='black', font=font)
+
+    # Draw description (wrapped)
+    wrapped_lines = textwrap.wrap(description, width=60)[:14]
+    draw.text((50, 100), '\n'.join(wrapped_lines), fill='black', font=small_font)
+
+    # Draw placeholder text
+    draw.text((50, 400), "Placeholder Image", fill='gray', font=font)
+    if footer:
+        draw.text((50, 450), footer, fill='gray', font=small_font)
+
+    return img
+
+
+def get_image_backend():
+    """Return the configured image backend, creating it on first use"""
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            _backend = _create_backend(IMAGE_BACKEND)
+        return _backend
+
+
+def _create_backend(name):
+    api_key = os.getenv("GEMINI_API_KEY")
+
+    if name == "local":
+        return LocalImageBackend()
+    if name == "gemini":
+        if not api_key:
+            raise ValueError("GEMINI_API_KEY not found. Please add it to your .env file.")
+        return GeminiImageBackend(api_key)
+    if name == "auto":
+        if api_key:
+            return GeminiImageBackend(api_key)
+        logging.warning("No GEMINI_API_KEY found, using local placeholder image backend")
+        return LocalImageBackend()
+
+    raise ValueError(f"Unknown IMAGE_BACKEND '{name}'")
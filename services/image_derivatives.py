@@ -0,0 +1,165 @@
+import io
+import os
+import json
+import logging
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from services.storage import get_storage
+
+# Kept free of app imports: this module is loaded by the worker processes too
+DERIVATIVE_WIDTHS = [int(width) for width in os.environ.get("DERIVATIVE_WIDTHS", "320,640,1024").split(',')]
+DERIVATIVE_WORKERS = int(os.environ.get("DERIVATIVE_WORKERS", "2"))
+DERIVATIVE_DIR = "static/images/derived"
+DERIVATIVE_FORMATS = {
+    'webp': {'format': 'WEBP', 'quality': 80, 'method': 4},
+    'jpeg': {'format': 'JPEG', 'quality': 82, 'optimize': True, 'progressive': True},
+}
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def build_derivatives(image_path):
+    """
+    Resize an image to each derivative width in every derivative format
+
+    Widths larger than the original are skipped; the original width is used
+    instead so small images still get WebP/JPEG variants.
+
+    Args:
+        image_path (str): Path to the source panel image
+
+    Returns:
+        list: Dicts with width, height, format and path for each variant
+    """
+    from PIL import Image
+
+    storage = get_storage()
+    stem = os.path.splitext(os.path.basename(image_path))[0]
+    variants = []
+
+    with storage.local_copy(image_path) as local_path, Image.open(local_path) as source:
+        source = source.convert('RGB')
+        widths = sorted({min(width, source.width) for width in DERIVATIVE_WIDTHS})
+
+        for width in widths:
+            height = round(source.height * width / source.width)
+            resized = source if width == source.width else source.resize((width, height), Image.LANCZOS)
+
+            for fmt, options in DERIVATIVE_FORMATS.items():
+                extension = 'jpg' if fmt == 'jpeg' else fmt
+                path = f"{DERIVATIVE_DIR}/{stem}_{width}.{extension}"
+                buffer = io.BytesIO()
+                resized.save(buffer, **options)
+                storage.save(path, buffer.getvalue())
+                variants.append({'width': width, 'height': height, 'format': fmt, 'path': path})
+
+    return variants
+
+
+def resample_image(image_path, max_width, max_height, quality):
+    """
+    Downsample an image to fit a pixel box and encode it as JPEG
+
+    Images already inside the box keep their size and are only re-encoded.
+
+    Args:
+        image_path (str): Path to the source image
+        max_width (int): Maximum width in pixels
+        max_height (int): Maximum height in pixels
+        quality (int): JPEG quality
+
+    Returns:
+        bytes: Encoded JPEG data
+    """
+    from PIL import Image
+
+    with get_storage().local_copy(image_path) as local_path, Image.open(local_path) as source:
+        image = source.convert('RGB')
+        scale = min(max_width / image.width, max_height / image.height, 1)
+        if scale < 1:
+            size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+            image = image.resize(size, Image.LANCZOS)
+
+    buffer = io.BytesIO()
+    image.save(buffer, format='JPEG', quality=quality, optimize=True)
+    return buffer.getvalue()
+
+
+def resample_images(jobs):
+    """
+    Run resample_image for several images in parallel in the process pool
+
+    Args:
+        jobs (list): (image_path, max_width, max_height, quality) tuples
+
+    Returns:
+        list: JPEG bytes per job, in order, or None where resampling failed
+    """
+    try:
+        futures = [_get_pool().submit(resample_image, *job) for job in jobs]
+    except Exception as e:
+        logging.error(f"Error scheduling image resampling: {e}")
+        return [None] * len(jobs)
+
+    results = []
+    for job, future in zip(jobs, futures):
+        try:
+            results.append(future.result())
+        except Exception as e:
+            logging.error(f"Error resampling {job[0]}: {e}")
+            results.append(None)
+    return results
+
+
+def schedule_derivatives(panel_id, image_path):
+    """
+    Build derivatives for a panel image in the process pool and record them when done
+
+    Returns immediately; the Panel's image_variants are filled in by a
+    completion callback if the panel still shows the same image.
+
+    Args:
+        panel_id (int): Panel whose image was just saved
+        image_path (str): Path of the saved image
+    """
+    try:
+        future = _get_pool().submit(build_derivatives, image_path)
+        future.add_done_callback(lambda f: _record_derivatives(panel_id, image_path, f))
+    except Exception as e:
+        logging.error(f"Error scheduling derivatives for panel {panel_id}: {e}")
+
+
+def _record_derivatives(panel_id, image_path, future):
+    from app import app, db
+    from models import Panel
+
+    try:
+        variants = future.result()
+    except Exception as e:
+        logging.error(f"Error building derivatives for {image_path}: {e}")
+        return
+
+    with app.app_context():
+        try:
+            panel = db.session.get(Panel, panel_id)
+            if panel is None or panel.image_path != image_path:
+                # The files may be shared with other panels; unreferenced ones are left to the asset GC
+                logging.info(f"Panel {panel_id} image changed, not recording derivatives of {image_path}")
+                return
+            panel.image_variants = json.dumps(variants)
+            db.session.commit()
+            logging.info(f"Recorded {len(variants)} derivatives for panel {panel_id}")
+        except Exception as e:
+            logging.error(f"Error recording derivatives for panel {panel_id}: {e}")
+            db.session.rollback()
+        finally:
+            db.session.remove()
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=DERIVATIVE_WORKERS)
+        return _pool
@@ -0,0 +1,261 @@
+import os
+import json
+import time
+import logging
+import threading
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import update
+from app import app, db
+from models import Job
+
+# "thread" runs jobs on a pool inside the web process, "external" only records
+# them so that separate `python worker.py` processes can pick them up
+JOB_BACKEND = os.environ.get("JOB_BACKEND", "thread")
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", "4"))
+JOB_POLL_INTERVAL = float(os.environ.get("JOB_POLL_INTERVAL", "1.0"))
+JOB_STALE_AFTER = int(os.environ.get("JOB_STALE_AFTER", "900"))
+# How often the thread backend looks for jobs left behind by a restarted process; 0 disables it
+JOB_RECOVERY_INTERVAL = int(os.environ.get("JOB_RECOVERY_INTERVAL", "60"))
+
+_handlers = {}
+_failure_hooks = {}
+_recovery_thread = None
+_executor = None
+_executor_lock = threading.Lock()
+
+
+class JobError(Exception):
+    """Raised by job handlers to fail a job with a user-facing message"""
+
+
+def job_handler(kind, on_failure=None):
+    """
+    Register a function as the handler for a job kind
+
+    The handler is called with the claimed Job inside an app context and
+    returns a JSON-serialisable dict that is stored as the job result.
+
+    Args:
+        kind (str): Job kind
+        on_failure (callable): Called with the failed Job after the handler
+            raised, to settle any rows the handler left half-done
+    """
+    def decorator(func):
+        _handlers[kind] = func
+        if on_failure is not None:
+            _failure_hooks[kind] = on_failure
+        return func
+    return decorator
+
+
+def enqueue_job(kind, payload=None, comic_id=None, panel_id=None):
+    """
+    Persist a new job and hand it to the configured backend
+
+    Args:
+        kind (str): Registered job kind
+        payload (dict): JSON-serialisable job arguments
+        comic_id (int): Comic the job belongs to, if any
+        panel_id (int): Panel the job fills in, if any
+
+    Returns:
+        Job: The queued job
+    """
+    if kind not in _handlers:
+        raise ValueError(f"No handler registered for job kind '{kind}'")
+
+    job = Job(
+        kind=kind,
+        payload=json.dumps(payload or {}),
+        comic_id=comic_id,
+        panel_id=panel_id,
+        status='queued'
+    )
+    db.session.add(job)
+    db.session.commit()
+
+    if JOB_BACKEND == 'thread':
+        _get_executor().submit(_run_in_app_context, job.id)
+
+    logging.info(f"Queued job {job.id} ({kind}) on {JOB_BACKEND} backend")
+    return job
+
+
+def get_job(job_id):
+    """Return the job with the given id, or None"""
+    return db.session.get(Job, job_id)
+
+
+def run_job(job_id):
+    """
+    Claim and execute a queued job
+
+    Args:
+        job_id (int): Job to run
+
+    Returns:
+        bool: True if this caller ran the job, False if it was already claimed
+    """
+    if not _claim_job(job_id):
+        return False
+
+    job = db.session.get(Job, job_id)
+    handler = _handlers.get(job.kind)
+
+    try:
+        if handler is None:
+            raise JobError(f"No handler registered for job kind '{job.kind}'")
+        result = handler(job)
+        job.set_result(result or {})
+        job.status = 'done'
+    except Exception as e:
+        logging.error(f"Job {job_id} ({job.kind}) failed: {e}")
+        db.session.rollback()
+        job = db.session.get(Job, job_id)
+        job.status = 'failed'
+        job.error_message = str(e) if isinstance(e, JobError) else 'Unexpected error while processing job'
+        _run_failure_hook(job)
+
+    job.finished_at = datetime.utcnow()
+    db.session.commit()
+    logging.info(f"Job {job_id} ({job.kind}) finished with status {job.status}")
+    return True
+
+
+def run_worker(poll_interval=JOB_POLL_INTERVAL):
+    """
+    Process queued jobs forever; used by worker.py for the external backend
+
+    Args:
+        poll_interval (float): Seconds to sleep when the queue is empty
+    """
+    logging.info("Job worker started")
+    with app.app_context():
+        while True:
+            try:
+                requeue_stale_jobs()
+                job = Job.query.filter_by(status='queued').order_by(Job.id).first()
+                if job is None:
+                    db.session.remove()
+                    time.sleep(poll_interval)
+                    continue
+                run_job(job.id)
+            except KeyboardInterrupt:
+                logging.info("Job worker stopped")
+                return
+            except Exception as e:
+                logging.error(f"Job worker error: {e}")
+                db.session.rollback()
+                time.sleep(poll_interval)
+
+
+def requeue_stale_jobs(stale_after=JOB_STALE_AFTER):
+    """Put back jobs whose worker died while running them"""
+    cutoff = datetime.utcnow() - timedelta(seconds=stale_after)
+    result = db.session.execute(
+        update(Job)
+        .where(Job.status == 'running', Job.started_at < cutoff)
+        .values(status='queued')
+    )
+    db.session.commit()
+    if result.rowcount:
+        logging.warning(f"Requeued {result.rowcount} stale job(s)")
+    return result.rowcount
+
+
+def start_recovery(interval=JOB_RECOVERY_INTERVAL):
+    """
+    Resume jobs left behind by a restarted process when using the thread backend
+
+    Runs once at startup and then every `interval` seconds on a daemon
+    thread: stale running jobs are requeued and queued jobs are handed to
+    this process's executor. Claiming is atomic, so several web processes
+    recovering the same job run it only once.
+    """
+    global _recovery_thread
+    if JOB_BACKEND != 'thread' or interval <= 0:
+        return
+    with _executor_lock:
+        if _recovery_thread is not None:
+            return
+        _recovery_thread = threading.Thread(target=_recover_forever, args=(interval,),
+                                            name="job-recovery", daemon=True)
+    _recovery_thread.start()
+
+
+def resubmit_queued_jobs(older_than=0):
+    """
+    Hand queued jobs to this process's executor
+
+    Args:
+        older_than (float): Only jobs queued at least this many seconds ago,
+            so jobs just enqueued by a live process are left to it
+
+    Returns:
+        int: Number of jobs submitted
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=older_than)
+    job_ids = [job_id for (job_id,) in db.session.query(Job.id)
+               .filter(Job.status == 'queued', Job.created_at <= cutoff).order_by(Job.id)]
+    for job_id in job_ids:
+        _get_executor().submit(_run_in_app_context, job_id)
+    if job_ids:
+        logging.info(f"Resubmitted {len(job_ids)} queued job(s)")
+    return len(job_ids)
+
+
+def _recover_forever(interval):
+    older_than = 0  # At startup no live process owns the queued jobs yet
+    while True:
+        with app.app_context():
+            try:
+                requeue_stale_jobs()
+                resubmit_queued_jobs(older_than)
+            except Exception as e:
+                logging.error(f"Job recovery error: {e}")
+                db.session.rollback()
+            finally:
+                db.session.remove()
+        older_than = interval
+        time.sleep(interval)
+
+
+def _run_failure_hook(job):
+    hook = _failure_hooks.get(job.kind)
+    if hook is None:
+        return
+    try:
+        hook(job)
+    except Exception as e:
+        logging.error(f"Failure hook for job {job.id} ({job.kind}) failed: {e}")
+        db.session.rollback()
+
+
+def _claim_job(job_id):
+    """Atomically move a job from queued to running so only one worker runs it"""
+    result = db.session.execute(
+        update(Job)
+        .where(Job.id == job_id, Job.status == 'queued')
+        .values(status='running', started_at=datetime.utcnow(), attempts=Job.attempts + 1)
+    )
+    db.session.commit()
+    return result.rowcount == 1
+
+
+def _run_in_app_context(job_id):
+    with app.app_context():
+        try:
+            run_job(job_id)
+        except Exception as e:
+            logging.error(f"Error running job {job_id}: {e}")
+        finally:
+            db.session.remove()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix='job-worker')
+        return _executor
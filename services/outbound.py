@@ -0,0 +1,273 @@
+import os
+import time
+import random
+import logging
+import threading
+
+# HTTP statuses worth retrying: throttling and transient server errors
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+_providers = {}
+_providers_lock = threading.Lock()
+
+
+class RetryableError(Exception):
+    """Raised by a wrapped call to signal a transient failure worth retrying"""
+
+    def __init__(self, message, status_code=None, retry_after=None, response=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+        self.response = response
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a provider whose circuit breaker is open"""
+
+
+class RateLimitedError(Exception):
+    """Raised when no rate-limit token became available in time"""
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at a fixed rate"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, timeout):
+        """
+        Take one token, waiting up to timeout seconds for a refill
+
+        Returns:
+            float: Seconds spent waiting, or None if no token became available
+        """
+        deadline = time.monotonic() + timeout
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                wait = (1 - self._tokens) / self.rate
+            if now + wait > deadline:
+                return None
+            time.sleep(wait)
+            waited += wait
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker
+
+    After failure_threshold retryable failures in a row the circuit opens and
+    calls fail fast; after reset_timeout one trial call is let through
+    (half-open) and its outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, name, failure_threshold, reset_timeout):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_at = None
+        self.times_opened = 0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == 'closed':
+                return True
+            if self.state == 'open' and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = 'half_open'
+                self._trial_in_flight = False
+            if self.state == 'half_open' and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def release(self):
+        """Give back a half-open trial that ended without an outcome, such as a rate-limit rejection"""
+        with self._lock:
+            if self.state == 'half_open':
+                self._trial_in_flight = False
+
+    def record_success(self):
+        with self._lock:
+            self.state = 'closed'
+            self.failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == 'half_open' or self.failures >= self.failure_threshold:
+                if self.state != 'open':
+                    self.times_opened += 1
+                    logging.warning(f"{self.name} circuit opened after {self.failures} consecutive failures")
+                self.state = 'open'
+                self.opened_at = time.monotonic()
+                self._trial_in_flight = False
+
+
+class Provider:
+    """Rate limiter, retry policy and circuit breaker for one external API"""
+
+    def __init__(self, name, rate, burst, max_wait, max_attempts, base_delay, max_delay,
+                 failure_threshold, reset_timeout):
+        self.name = name
+        self.bucket = TokenBucket(rate, burst)
+        self.breaker = CircuitBreaker(name, failure_threshold, reset_timeout)
+        self.max_wait = max_wait
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.metrics = {
+            'calls': 0,
+            'successes': 0,
+            'failures': 0,
+            'retries': 0,
+            'throttled': 0,
+            'throttle_rejections': 0,
+            'throttle_wait_seconds': 0.0,
+            'short_circuited': 0,
+        }
+        self._metrics_lock = threading.Lock()
+
+    def call(self, func, *args, **kwargs):
+        """
+        Call func with rate limiting, jittered exponential retry and circuit breaking
+
+        Raises:
+            CircuitOpenError: The provider is currently considered unhealthy
+            RateLimitedError: No token became available within max_wait
+            Exception: The last error from func once retries are exhausted
+        """
+        self._count('calls')
+        if not self.breaker.allow():
+            self._count('short_circuited')
+            raise CircuitOpenError(f"{self.name} circuit is open, failing fast")
+
+        settled = False
+        try:
+            for attempt in range(1, self.max_attempts + 1):
+                waited = self.bucket.acquire(self.max_wait)
+                if waited is None:
+                    self._count('throttle_rejections')
+                    raise RateLimitedError(f"{self.name} rate limit exceeded")
+                if waited:
+                    self._count('throttled')
+                    self._count('throttle_wait_seconds', waited)
+
+                try:
+                    result = func(*args, **kwargs)
+                except Exception as e:
+                    if not is_retryable(e):
+                        # The provider answered; a bad request says nothing about its health
+                        self.breaker.record_success()
+                        settled = True
+                        self._count('failures')
+                        raise
+
+                    self.breaker.record_failure()
+                    settled = True
+                    if attempt == self.max_attempts or self.breaker.state == 'open':
+                        self._count('failures')
+                        raise
+
+                    delay = self._backoff(attempt, getattr(e, 'retry_after', None))
+                    self._count('retries')
+                    logging.warning(f"{self.name} call failed ({e}), retry {attempt} in {delay:.1f}s")
+                    time.sleep(delay)
+                    continue
+
+                self.breaker.record_success()
+                settled = True
+                self._count('successes')
+                return result
+        finally:
+            if not settled:
+                # Otherwise a half-open breaker would wait forever for this trial's outcome
+                self.breaker.release()
+
+    def stats(self):
+        with self._metrics_lock:
+            stats = dict(self.metrics)
+        stats['throttle_wait_seconds'] = round(stats['throttle_wait_seconds'], 3)
+        stats['breaker_state'] = self.breaker.state
+        stats['breaker_opened'] = self.breaker.times_opened
+        stats['consecutive_failures'] = self.breaker.failures
+        return stats
+
+    def _backoff(self, attempt, retry_after=None):
+        """Full-jitter exponential backoff, honouring a server Retry-After hint"""
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** (attempt - 1))))
+        try:
+            if retry_after:
+                delay = max(delay, min(float(retry_after), self.max_delay))
+        except (TypeError, ValueError):
+            pass
+        return delay
+
+    def _count(self, key, amount=1):
+        with self._metrics_lock:
+            self.metrics[key] += amount
+
+
+def get_provider(name):
+    """
+    Return the shared Provider for an API, configured from environment variables
+
+    Settings are read as <NAME>_RATE_PER_SECOND, <NAME>_BURST, <NAME>_MAX_WAIT,
+    <NAME>_MAX_ATTEMPTS, <NAME>_RETRY_BASE_DELAY, <NAME>_RETRY_MAX_DELAY,
+    <NAME>_BREAKER_THRESHOLD and <NAME>_BREAKER_RESET.
+    """
+    with _providers_lock:
+        if name not in _providers:
+            prefix = name.upper()
+
+            def setting(key, default):
+                return float(os.environ.get(f"{prefix}_{key}", default))
+
+            _providers[name] = Provider(
+                name,
+                rate=setting("RATE_PER_SECOND", 2),
+                burst=setting("BURST", 5),
+                max_wait=setting("MAX_WAIT", 30),
+                max_attempts=int(setting("MAX_ATTEMPTS", 4)),
+                base_delay=setting("RETRY_BASE_DELAY", 1),
+                max_delay=setting("RETRY_MAX_DELAY", 20),
+                failure_threshold=int(setting("BREAKER_THRESHOLD", 5)),
+                reset_timeout=setting("BREAKER_RESET", 30),
+            )
+        return _providers[name]
+
+
+def outbound_metrics():
+    """Return throttling, retry and breaker metrics for every provider used so far"""
+    with _providers_lock:
+        providers = dict(_providers)
+    return {name: provider.stats() for name, provider in providers.items()}
+
+
+def is_retryable(error):
+    """Classify an exception from any provider SDK or HTTP client as transient or not"""
+    if isinstance(error, RetryableError):
+        return True
+
+    status = getattr(error, 'code', None) or getattr(error, 'status_code', None)
+    if isinstance(status, int):
+        return status in RETRYABLE_STATUS
+
+    # Network-level failures from requests/httpx/urllib3 are named consistently enough
+    name = type(error).__name__
+    return any(marker in name for marker in ('Timeout', 'Connection', 'Connect', 'RemoteProtocol'))
@@ -0,0 +1,235 @@
+import os
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from app import db
+from models import Panel
+from services.job_queue import job_handler, JobError
+from services.gemini_service import generate_comic_panel
+from services.elevenlabs_service import generate_narration_audio, generate_streamed_narration_audio
+from services.image_derivatives import schedule_derivatives
+
+# Panels generated at once by a single storyboard job
+STORYBOARD_CONCURRENCY = int(os.environ.get("STORYBOARD_CONCURRENCY", "4"))
+# Narrations synthesised alongside their panel images, shared by all jobs
+NARRATION_WORKERS = int(os.environ.get("NARRATION_WORKERS", "8"))
+
+_narration_executor = None
+_narration_executor_lock = threading.Lock()
+
+
+def render_panel_assets(scene_description, characters, style, panel_number, narration_text=None):
+    """
+    Generate the image and optional narration audio for one panel
+
+    The two provider calls are independent, so narration is synthesised on
+    a background thread while the image is generated. If the image fails
+    the narration is dropped, as before; if only the narration fails the
+    panel still succeeds with a warning.
+
+    Args:
+        scene_description (str): Description of the scene to generate
+        characters (dict or CharacterIndex): Character definitions for consistency
+        style (str): Art style for the comic
+        panel_number (int): Panel number for file naming
+        narration_text (str): Narration to synthesise, if any
+
+    Returns:
+        dict: image (an IngestedImage), image_path, audio_path, a list of
+        warnings and per-step timings in seconds
+    """
+    result = {'image': None, 'image_path': None, 'audio_path': None, 'warnings': [], 'timings': {}}
+    started = time.perf_counter()
+
+    narration = None
+    if narration_text:
+        narration = _get_narration_executor().submit(_timed, generate_narration_audio, narration_text, panel_number)
+
+    result['image'], result['timings']['image'] = _timed(
+        generate_comic_panel,
+        scene_description=scene_description,
+        characters=characters,
+        style=style,
+        panel_number=panel_number
+    )
+
+    if narration is not None:
+        try:
+            result['audio_path'], result['timings']['narration'] = narration.result()
+        except Exception as e:
+            logging.error(f"Error generating narration for panel {panel_number}: {e}")
+
+    result['timings']['total'] = round(time.perf_counter() - started, 3)
+    logging.info(f"Panel {panel_number} assets rendered in {result['timings']}")
+
+    if not result['image']:
+        # Audio for a failed panel is not recorded; the asset GC removes the file
+        result['audio_path'] = None
+        return result
+    result['image_path'] = result['image'].path
+
+    if narration_text and not result['audio_path']:
+        result['warnings'].append('Panel generated successfully, but voice narration failed. You can add it later.')
+
+    return result
+
+
+def _timed(func, *args, **kwargs):
+    """Call func and return (its result, seconds taken)"""
+    started = time.perf_counter()
+    value = func(*args, **kwargs)
+    return value, round(time.perf_counter() - started, 3)
+
+
+def _get_narration_executor():
+    global _narration_executor
+    with _narration_executor_lock:
+        if _narration_executor is None:
+            _narration_executor = ThreadPoolExecutor(max_workers=NARRATION_WORKERS, thread_name_prefix="narration")
+        return _narration_executor
+
+
+def fail_pending_panels(job):
+    """Mark the panels a failed job was filling in as failed so they stop showing a spinner"""
+    panel_ids = [job.panel_id] if job.panel_id else job.get_payload().get('panel_ids', [])
+    if not panel_ids:
+        return
+    panels = Panel.query.filter(Panel.id.in_(panel_ids), Panel.status == 'pending').all()
+    for panel in panels:
+        panel.status = 'failed'
+        panel.error_message = 'Unexpected error while generating this panel. Please try again.'
+    db.session.commit()
+    if panels:
+        logging.warning(f"Marked {len(panels)} pending panel(s) of failed job {job.id} as failed")
+
+
+@job_handler('generate_panel', on_failure=fail_pending_panels)
+def generate_panel_job(job):
+    """Fill in a pending panel with its generated image and narration"""
+    panel = db.session.get(Panel, job.panel_id) if job.panel_id else None
+    if panel is None:
+        logging.warning(f"Panel for job {job.id} no longer exists, skipping")
+        return {'skipped': True}
+
+    comic = panel.comic
+    assets = render_panel_assets(
+        scene_description=panel.description,
+        characters=comic.get_character_index(),
+        style=comic.style,
+        panel_number=panel.panel_number,
+        narration_text=panel.narration_text
+    )
+
+    if not assets['image_path']:
+        panel.status = 'failed'
+        panel.error_message = 'Failed to generate panel image. Please check your API key and try again.'
+        db.session.commit()
+        raise JobError(panel.error_message)
+
+    panel.set_image(assets['image'])
+    panel.audio_path = assets['audio_path']
+    panel.status = 'ready'
+    panel.error_message = None
+    db.session.commit()
+    schedule_derivatives(panel.id, panel.image_path)
+
+    return {
+        'panel_id': panel.id,
+        'panel_number': panel.panel_number,
+        'image_path': panel.image_path,
+        'audio_path': panel.audio_path,
+        'warnings': assets['warnings'],
+        'timings': assets['timings']
+    }
+
+
+@job_handler('generate_storyboard', on_failure=fail_pending_panels)
+def generate_storyboard_job(job):
+    """Fill in a batch of pending panels concurrently, reporting per-panel progress"""
+    panel_ids = job.get_payload().get('panel_ids', [])
+    panels = [db.session.get(Panel, panel_id) for panel_id in panel_ids]
+    panels = [panel for panel in panels if panel is not None]
+    if not panels:
+        return {'skipped': True}
+
+    comic = panels[0].comic
+    characters = comic.get_character_index()
+    progress = {
+        'total': len(panels),
+        'completed': 0,
+        'failed': 0,
+        'panels': {str(panel.id): 'pending' for panel in panels},
+        'timings': {}
+    }
+    job.set_result(progress)
+    db.session.commit()
+
+    # Workers only call the generation services; all database writes stay on this thread
+    with ThreadPoolExecutor(max_workers=min(STORYBOARD_CONCURRENCY, len(panels))) as executor:
+        futures = {
+            executor.submit(
+                render_panel_assets,
+                scene_description=panel.description,
+                characters=characters,
+                style=comic.style,
+                panel_number=panel.panel_number,
+                narration_text=panel.narration_text
+            ): panel
+            for panel in panels
+        }
+
+        for future in as_completed(futures):
+            panel = futures[future]
+            try:
+                assets = future.result()
+            except Exception as e:
+                logging.error(f"Error generating storyboard panel {panel.panel_number}: {e}")
+                assets = {'image': None, 'image_path': None, 'audio_path': None, 'warnings': [], 'timings': {}}
+
+            if assets['image']:
+                panel.set_image(assets['image'])
+                panel.audio_path = assets['audio_path']
+                panel.status = 'ready'
+                progress['completed'] += 1
+                progress['panels'][str(panel.id)] = 'ready'
+            else:
+                panel.status = 'failed'
+                panel.error_message = 'Failed to generate panel image. Please check your API key and try again.'
+                progress['failed'] += 1
+                progress['panels'][str(panel.id)] = 'failed'
+
+            progress['timings'][str(panel.id)] = assets['timings']
+            job.set_result(progress)
+            db.session.commit()
+            if panel.image_path:
+                schedule_derivatives(panel.id, panel.image_path)
+
+    if progress['failed'] == progress['total']:
+        raise JobError('Failed to generate any storyboard panels. Please check your API key and try again.')
+
+    return progress
+
+
+@job_handler('narrate_panel')
+def narrate_panel_job(job):
+    """Synthesise a panel's edited narration; the edit page streams it while this runs"""
+    narration_text = job.get_payload().get('narration_text')
+    panel = db.session.get(Panel, job.panel_id) if job.panel_id else None
+    if panel is None or panel.narration_text != narration_text:
+        logging.info(f"Narration for job {job.id} was deleted or replaced, skipping")
+        return {'skipped': True}
+
+    audio_path = generate_streamed_narration_audio(narration_text, panel.id)
+    if not audio_path:
+        raise JobError('Narration could not be generated')
+
+    # The panel may have been edited or deleted while the audio was synthesised
+    db.session.expire_all()
+    panel = db.session.get(Panel, job.panel_id)
+    if panel is None or panel.narration_text != narration_text:
+        return {'skipped': True}
+    panel.audio_path = audio_path
+    panel.audio_outdated = False
+    db.session.commit()
+    return {'panel_id': panel.id, 'audio_path': audio_path}
@@ -0,0 +1,331 @@
+import os
+import shutil
+import logging
+import mimetypes
+import tempfile
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+# Kept free of app imports: the derivative worker processes use storage too
+STORAGE_BACKEND = os.environ.get("STORAGE_BACKEND", "local")
+STORAGE_ROOT = os.environ.get("STORAGE_ROOT", ".")
+STORAGE_CHUNK_SIZE = int(os.environ.get("STORAGE_CHUNK_SIZE", str(1024 * 1024)))
+
+S3_BUCKET = os.environ.get("S3_BUCKET")
+S3_ENDPOINT_URL = os.environ.get("S3_ENDPOINT_URL")  # e.g. a MinIO server
+S3_REGION = os.environ.get("S3_REGION")
+S3_PREFIX = os.environ.get("S3_PREFIX", "")
+S3_PRESIGN_EXPIRES = int(os.environ.get("S3_PRESIGN_EXPIRES", "3600"))
+
+_storage = None
+_storage_lock = threading.Lock()
+
+
+class LocalStorage:
+    """
+    Stores assets as files relative to a root directory
+
+    Keys are the relative paths already recorded on panels, such as
+    "static/images/panel_<hash>.jpg", so existing rows keep working.
+    """
+
+    name = "local"
+
+    def __init__(self, root="."):
+        self.root = root
+
+    def path(self, key):
+        return os.path.join(self.root, key)
+
+    def save(self, key, source):
+        """
+        Write an asset atomically from bytes, a file object or an iterable of chunks
+
+        Args:
+            key (str): Asset key
+            source: bytes, a readable binary file object or an iterable of bytes
+
+        Returns:
+            int: Number of bytes written
+        """
+        path = self.path(key)
+        directory = os.path.dirname(path) or "."
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                written = 0
+                for chunk in _iter_source(source):
+                    f.write(chunk)
+                    written += len(chunk)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return written
+
+    def open(self, key):
+        """Open an asset for binary reading"""
+        return open(self.path(key), 'rb')
+
+    def iter_chunks(self, key, chunk_size=STORAGE_CHUNK_SIZE):
+        """Yield an asset's bytes in chunks without loading it whole"""
+        with self.open(key) as f:
+            yield from iter(lambda: f.read(chunk_size), b'')
+
+    def exists(self, key):
+        return bool(key) and os.path.isfile(self.path(key))
+
+    def size(self, key):
+        return os.path.getsize(self.path(key))
+
+    def touch(self, key):
+        """Mark an existing asset as just written; returns False if it does not exist"""
+        try:
+            os.utime(self.path(key))
+            return True
+        except FileNotFoundError:
+            return False
+
+    def modified(self, key):
+        """Last modification time as naive UTC, or None if the asset does not exist"""
+        try:
+            mtime = os.path.getmtime(self.path(key))
+        except FileNotFoundError:
+            return None
+        return datetime.fromtimestamp(mtime, timezone.utc).replace(tzinfo=None)
+
+    def delete(self, key):
+        """Delete an asset; returns False if it did not exist"""
+        try:
+            os.remove(self.path(key))
+            return True
+        except FileNotFoundError:
+            return False
+
+    def list(self, prefix):
+        """
+        Yield (key, size, modified) for every asset under a key prefix
+
+        Args:
+            prefix (str): Directory-style prefix, e.g. "static/images/"
+        """
+        base = self.path(prefix)
+        for directory, _, files in os.walk(base):
+            for filename in files:
+                path = os.path.join(directory, filename)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                key = os.path.relpath(path, self.root).replace(os.sep, '/')
+                yield key, stat.st_size, datetime.fromtimestamp(stat.st_mtime, timezone.utc).replace(tzinfo=None)
+
+    def url(self, key, download_name=None):
+        """Local files are served by the app itself, so there is no direct URL"""
+        return None
+
+    @contextmanager
+    def local_copy(self, key):
+        """Yield a filesystem path for an asset, for libraries that need one"""
+        yield self.path(key)
+
+
+class S3Storage:
+    """
+    Stores assets in an S3-compatible bucket (AWS S3, MinIO, R2, ...)
+
+    Uploads stream through boto3's multipart transfer and downloads are read
+    in chunks, so large files are never held in memory. Browsers are sent to
+    presigned URLs rather than having the app proxy the bytes.
+    """
+
+    name = "s3"
+
+    def __init__(self, bucket, endpoint_url=None, region=None, prefix=""):
+        if not bucket:
+            raise ValueError("S3_BUCKET must be set for the s3 storage backend")
+        self.bucket = bucket
+        self.endpoint_url = endpoint_url
+        self.region = region
+        self.prefix = prefix
+        self._client = None
+        self._client_lock = threading.Lock()
+
+    @property
+    def client(self):
+        """Create the boto3 client on first use; boto3 is only needed for this backend"""
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    import boto3
+                    self._client = boto3.client('s3', endpoint_url=self.endpoint_url, region_name=self.region)
+        return self._client
+
+    def object_key(self, key):
+        return f"{self.prefix}{key}"
+
+    def save(self, key, source):
+        """
+        Upload an asset from bytes, a file object or an iterable of chunks
+
+        Chunk iterables are spooled to a temporary file first, since
+        multipart uploads need a readable file object.
+
+        Returns:
+            int: Number of bytes written
+        """
+        with tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024) as spool:
+            for chunk in _iter_source(source):
+                spool.write(chunk)
+            written = spool.tell()
+            spool.seek(0)
+            self.client.upload_fileobj(spool, self.bucket, self.object_key(key),
+                                       ExtraArgs={'ContentType': _content_type(key)})
+        return written
+
+    def open(self, key):
+        """Open an asset as a streaming, read-only file object"""
+        return self.client.get_object(Bucket=self.bucket, Key=self.object_key(key))['Body']
+
+    def iter_chunks(self, key, chunk_size=STORAGE_CHUNK_SIZE):
+        body = self.open(key)
+        try:
+            yield from body.iter_chunks(chunk_size)
+        finally:
+            body.close()
+
+    def exists(self, key):
+        if not key:
+            return False
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self.object_key(key))
+            return True
+        except Exception as e:
+            if _is_not_found(e):
+                return False
+            raise
+
+    def size(self, key):
+        return self.client.head_object(Bucket=self.bucket, Key=self.object_key(key))['ContentLength']
+
+    def touch(self, key):
+        """
+        Mark an existing asset as just written; returns False if it does not exist
+
+        S3 cannot change LastModified on its own, so the object is copied onto
+        itself with its metadata restated, which happens server-side.
+        """
+        try:
+            head = self.client.head_object(Bucket=self.bucket, Key=self.object_key(key))
+        except Exception as e:
+            if _is_not_found(e):
+                return False
+            raise
+        self.client.copy_object(
+            Bucket=self.bucket, Key=self.object_key(key),
+            CopySource={'Bucket': self.bucket, 'Key': self.object_key(key)},
+            MetadataDirective='REPLACE',
+            ContentType=head.get('ContentType') or _content_type(key),
+            Metadata=head.get('Metadata') or {}
+        )
+        return True
+
+    def modified(self, key):
+        """Last modification time as naive UTC, or None if the asset does not exist"""
+        try:
+            head = self.client.head_object(Bucket=self.bucket, Key=self.object_key(key))
+        except Exception as e:
+            if _is_not_found(e):
+                return None
+            raise
+        return head['LastModified'].astimezone(timezone.utc).replace(tzinfo=None)
+
+    def delete(self, key):
+        existed = self.exists(key)
+        self.client.delete_object(Bucket=self.bucket, Key=self.object_key(key))
+        return existed
+
+    def list(self, prefix):
+        paginator = self.client.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self.object_key(prefix)):
+            for item in page.get('Contents', []):
+                key = item['Key'][len(self.prefix):]
+                yield key, item['Size'], item['LastModified'].astimezone(timezone.utc).replace(tzinfo=None)
+
+    def url(self, key, download_name=None):
+        """
+        Presigned GET URL for an asset
+
+        Args:
+            key (str): Asset key
+            download_name (str): If given, the browser saves the file under this name
+
+        Returns:
+            str: Time-limited URL
+        """
+        params = {'Bucket': self.bucket, 'Key': self.object_key(key)}
+        if download_name:
+            safe_name = download_name.replace('"', '')
+            params['ResponseContentDisposition'] = f'attachment; filename="{safe_name}"'
+        return self.client.generate_presigned_url('get_object', Params=params, ExpiresIn=S3_PRESIGN_EXPIRES)
+
+    @contextmanager
+    def local_copy(self, key):
+        """Download an asset to a temporary file for libraries that need a path"""
+        fd, tmp_path = tempfile.mkstemp(suffix=os.path.splitext(key)[1])
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                body = self.open(key)
+                try:
+                    shutil.copyfileobj(body, f, STORAGE_CHUNK_SIZE)
+                finally:
+                    body.close()
+            yield tmp_path
+        finally:
+            os.remove(tmp_path)
+
+
+def get_storage():
+    """
+    Return the configured asset storage, created on first use
+
+    STORAGE_BACKEND selects "local" (default) or "s3".
+    """
+    global _storage
+    if _storage is None:
+        with _storage_lock:
+            if _storage is None:
+                _storage = _create_storage(STORAGE_BACKEND)
+                logging.info(f"Using {_storage.name} asset storage")
+    return _storage
+
+
+def _create_storage(name):
+    if name == "s3":
+        return S3Storage(S3_BUCKET, endpoint_url=S3_ENDPOINT_URL, region=S3_REGION, prefix=S3_PREFIX)
+    if name != "local":
+        logging.warning(f"Unknown STORAGE_BACKEND {name!r}, using local storage")
+    return LocalStorage(STORAGE_ROOT)
+
+
+def _iter_source(source):
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        yield bytes(source)
+    elif hasattr(source, 'read'):
+        yield from iter(lambda: source.read(STORAGE_CHUNK_SIZE), b'')
+    else:
+        for chunk in source:
+            if chunk:
+                yield chunk
+
+
+def _content_type(key):
+    return mimetypes.guess_type(key)[0] or 'application/octet-stream'
+
+
+def _is_not_found(error):
+    response = getattr(error, 'response', None) or {}
+    return response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound')
@@ -0,0 +1,123 @@
+import os
+import json
+import time
+import logging
+import tempfile
+import threading
+
+
+class VoiceCatalog:
+    """
+    Process-wide cache of a provider's voice list with stale-while-revalidate refresh
+
+    Fresh data is returned straight from memory. Once the TTL has passed the
+    stale list is still returned immediately while a single background
+    thread fetches a new one. The list can be persisted to disk so a
+    restarted worker starts warm instead of calling the provider.
+    """
+
+    def __init__(self, loader, ttl, path=None, name="Voice catalogue"):
+        """
+        Args:
+            loader (callable): Returns the current voice list, or None on failure
+            ttl (int): Seconds before the cached list is refreshed
+            path (str): JSON file to persist the list in, or None for memory only
+            name (str): Name used in log messages
+        """
+        self.loader = loader
+        self.ttl = ttl
+        self.path = path
+        self.name = name
+        self._voices = None
+        self._fetched_at = 0.0
+        self._refreshing = False
+        self._lock = threading.Lock()
+
+    def voices(self):
+        """
+        Return the cached voice list, refreshing it in the background when stale
+
+        Only a cold cache with nothing on disk waits for the provider.
+
+        Returns:
+            list: Voice dictionaries, or an empty list if none could be loaded
+        """
+        with self._lock:
+            if self._voices is None:
+                self._load_from_disk()
+            voices = self._voices
+            stale = time.time() - self._fetched_at > self.ttl
+
+        if voices is None:
+            return self.refresh() or []
+        if stale:
+            self._refresh_in_background()
+        return voices
+
+    def refresh(self):
+        """
+        Fetch the voice list now; a failed fetch keeps the previous list
+
+        Returns:
+            list: The new voice list, or None if the fetch failed
+        """
+        try:
+            voices = self.loader()
+        except Exception as e:
+            logging.error(f"Error refreshing {self.name.lower()}: {e}")
+            voices = None
+
+        with self._lock:
+            self._refreshing = False
+            if voices is None:
+                return None
+            self._voices = voices
+            self._fetched_at = time.time()
+            self._save_to_disk()
+        logging.info(f"{self.name} refreshed with {len(voices)} voices")
+        return voices
+
+    def info(self):
+        """Describe the cached list for the JSON endpoint"""
+        with self._lock:
+            age = time.time() - self._fetched_at if self._voices is not None else None
+            return {
+                'fetched_at': self._fetched_at or None,
+                'age_seconds': round(age, 1) if age is not None else None,
+                'stale': age is None or age > self.ttl,
+                'refreshing': self._refreshing,
+            }
+
+    def _refresh_in_background(self):
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        threading.Thread(target=self.refresh, name="voice-catalog-refresh", daemon=True).start()
+
+    def _load_from_disk(self):
+        if not self.path:
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                stored = json.load(f)
+            self._voices = stored['voices']
+            self._fetched_at = stored['fetched_at']
+            logging.info(f"{self.name} loaded {len(self._voices)} voices from {self.path}")
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, KeyError) as e:
+            logging.warning(f"Ignoring unreadable {self.name.lower()} file {self.path}: {e}")
+
+    def _save_to_disk(self):
+        if not self.path:
+            return
+        try:
+            directory = os.path.dirname(self.path) or "."
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({'voices': self._voices, 'fetched_at': self._fetched_at}, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logging.error(f"Error saving {self.name.lower()} to {self.path}: {e}")
@@ -11,6 +11,7 @@ function initializeApp() {
     initializeAudioPlayers();
     initializeTooltips();
     initializeConfirmDialogs();
+    initializeJobPolling();
     
     // Auto-hide alerts after 5 seconds
     setTimeout(function() {
@@ -159,6 +160,52 @@ function initializeConfirmDialogs() {
     });
 }
 
+function initializeJobPolling() {
+    // Poll background jobs for pending panels and reload once they settle
+    const pendingPanels = document.querySelectorAll('[data-job-id]');
+    const jobIds = new Set(Array.from(pendingPanels).map(function(element) {
+        return element.dataset.jobId;
+    }));
+    jobIds.forEach(function(jobId) {
+        pollJob(jobId, function(job) {
+            if (job.result && job.result.warnings && job.result.warnings.length) {
+                sessionStorage.setItem('jobWarnings', JSON.stringify(job.result.warnings));
+            }
+            window.location.reload();
+        });
+    });
+    
+    const warnings = sessionStorage.getItem('jobWarnings');
+    if (warnings) {
+        sessionStorage.removeItem('jobWarnings');
+        JSON.parse(warnings).forEach(function(message) {
+            showAlert(message, 'warning');
+        });
+    }
+}
+
+function pollJob(jobId, onFinished, interval = 3000, onProgress = null) {
+    // onProgress, if given, receives the partial result of a job that is still running
+    fetch(`/jobs/${jobId}`, { headers: { 'Accept': 'application/json' } })
+        .then(function(response) {
+            return response.ok ? response.json() : null;
+        })
+        .then(function(job) {
+            if (job && (job.status === 'done' || job.status === 'failed')) {
+                onFinished(job);
+            } else if (job) {
+                if (onProgress && job.result) {
+                    onProgress(job.result);
+                }
+                setTimeout(function() { pollJob(jobId, onFinished, interval, onProgress); }, interval);
+            }
+        })
+        .catch(function(error) {
+            console.error('Error polling job:', error);
+            setTimeout(function() { pollJob(jobId, onFinished, interval, onProgress); }, interval * 2);
+        });
+}
+
 function showLoadingSpinner(container) {
     const spinner = container.querySelector('.loading-spinner');
     if (spinner) {
@@ -229,6 +276,19 @@ function toggleEditCharacterForm() {
     }
 }
 
+function toggleStoryboardForm() {
+    const storyboardForm = document.getElementById('storyboardForm');
+    if (storyboardForm) {
+        if (storyboardForm.style.display === 'none' || !storyboardForm.style.display) {
+            storyboardForm.style.display = 'block';
+            storyboardForm.classList.add('fade-in');
+        } else {
+            storyboardForm.style.display = 'none';
+            storyboardForm.classList.remove('fade-in');
+        }
+    }
+}
+
 function previewPanel(panelId) {
     const panel = document.querySelector(`[data-panel-id="${panelId}"]`);
     if (panel) {
@@ -244,23 +304,68 @@ function previewPanel(panelId) {
     }
 }
 
-function exportComic(comicId) {
-    // Show loading state
+function exportComic(comicId, preset) {
     const exportBtn = document.querySelector(`[onclick="exportComic(${comicId})"]`);
-    if (exportBtn) {
-        exportBtn.disabled = true;
-        exportBtn.innerHTML = '<span class="spinner-border spinner-border-sm" role="status"></span> Exporting...';
-        
-        // Re-enable button after 10 seconds (in case of slow export)
-        setTimeout(function() {
-            exportBtn.disabled = false;
-            exportBtn.innerHTML = '<i data-feather="download"></i> Export PDF';
+    const params = { export: 'pdf' };
+    if (preset) {
+        params.preset = preset;
+    }
+    startExport(comicId, params, exportBtn, '<i data-feather="download"></i> Export PDF',
+        `/comic/${comicId}/export_pdf` + (preset ? `?preset=${preset}` : ''));
+}
+
+function exportCharacterSheet(comicId) {
+    const exportBtn = document.querySelector(`[onclick="exportCharacterSheet(${comicId})"]`);
+    startExport(comicId, { export: 'character_sheet' }, exportBtn, '<i data-feather="users"></i> Character Sheet');
+}
+
+function startExport(comicId, params, exportBtn, label, fallbackUrl) {
+    // Exports are built by a background job; show its progress, then download the file
+    function setButton(html, disabled) {
+        if (exportBtn) {
+            exportBtn.disabled = disabled;
+            exportBtn.innerHTML = html;
             feather.replace();
-        }, 10000);
+        }
     }
     
-    // Redirect to export endpoint
-    window.location.href = `/comic/${comicId}/export_pdf`;
+    setButton('<span class="spinner-border spinner-border-sm" role="status"></span> Exporting...', true);
+    
+    fetch(`/comic/${comicId}/exports`, {
+        method: 'POST',
+        headers: { 'Accept': 'application/json' },
+        body: new URLSearchParams(params)
+    })
+        .then(function(response) {
+            return response.json().then(function(data) {
+                if (!response.ok) {
+                    throw new Error(data.error || 'Error starting export');
+                }
+                return data;
+            });
+        })
+        .then(function(data) {
+            pollJob(data.job_id, function(job) {
+                setButton(label, false);
+                if (job.status === 'done') {
+                    window.location.href = data.download_url;
+                } else {
+                    showAlert(job.error || 'Export failed. Please try again.', 'danger');
+                }
+            }, 1000, function(result) {
+                const stage = result.stage === 'layout' ? `${result.completed}/${result.total} panels` : 'Exporting...';
+                setButton(`<span class="spinner-border spinner-border-sm" role="status"></span> ${stage}`, true);
+            });
+        })
+        .catch(function(error) {
+            console.error('Error starting export:', error);
+            setButton(label, false);
+            if (fallbackUrl) {
+                window.location.href = fallbackUrl;
+            } else {
+                showAlert(error.message, 'danger');
+            }
+        });
 }
 
 // Character management functions
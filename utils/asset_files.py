@@ -0,0 +1,82 @@
+import os
+import re
+import hashlib
+from services.storage import get_storage
+
+# Content hashes in asset names are truncated SHA-256 digests
+HASH_LENGTH = 32
+_HASH_PATTERN = re.compile(rf'_([0-9a-f]{{{HASH_LENGTH}}})(?:_\d+)?\.\w+$')
+
+
+def content_hash(data):
+    """Return the truncated SHA-256 digest used in asset file names"""
+    return hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+
+
+def asset_path(directory, prefix, digest, extension):
+    """Build the path of a content-addressed asset"""
+    return f"{directory}/{prefix}_{digest}.{extension}"
+
+
+def write_asset(directory, prefix, data, extension):
+    """
+    Store bytes under a name derived from their content hash
+
+    Identical content always maps to the same asset, so an existing one is
+    reused and never overwritten with different bytes. Reuse refreshes its
+    modification time so the asset GC treats it as newly written until the
+    caller has recorded it on a panel.
+
+    Args:
+        directory (str): Target directory, e.g. "static/images"
+        prefix (str): Human-readable name prefix, e.g. "panel"
+        data (bytes): File contents
+        extension (str): File extension without the dot
+
+    Returns:
+        str: Path of the asset
+    """
+    storage = get_storage()
+    path = asset_path(directory, prefix, content_hash(data), extension)
+    if not storage.touch(path):
+        storage.save(path, data)
+    return path
+
+
+def finalize_asset(tmp_path, directory, prefix, extension):
+    """
+    Store a fully written local temporary file under its content-addressed name
+
+    The file is hashed and then streamed into storage in chunks. As with
+    write_asset, an existing asset with the same content is reused and
+    its modification time refreshed.
+
+    Args:
+        tmp_path (str): Local file to hash and store; it is always removed
+        directory (str): Target directory
+        prefix (str): Human-readable name prefix
+        extension (str): File extension without the dot
+
+    Returns:
+        str: Path of the asset
+    """
+    digest = hashlib.sha256()
+    with open(tmp_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+
+    storage = get_storage()
+    path = asset_path(directory, prefix, digest.hexdigest()[:HASH_LENGTH], extension)
+    try:
+        if not storage.touch(path):
+            with open(tmp_path, 'rb') as f:
+                storage.save(path, f)
+    finally:
+        os.remove(tmp_path)
+    return path
+
+
+def asset_hash(path):
+    """Return the content hash embedded in an asset path, or None for legacy names"""
+    match = _HASH_PATTERN.search(path or '')
+    return match.group(1) if match else None
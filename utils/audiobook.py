@@ -0,0 +1,136 @@
+import os
+import logging
+import tempfile
+from functools import lru_cache
+from services.disk_cache import DiskCache
+from services.storage import get_storage
+from utils.asset_files import HASH_LENGTH, asset_hash
+from utils.mp3_frames import audio_frames, build_chapter_tag, iter_frames
+
+
+def audiobook_path(comic, panels):
+    """
+    Storage path of a comic's audiobook for the current set of narrations
+
+    The name is derived from the panel titles and narration files, so an
+    unchanged comic maps to an already built file and any narration change
+    produces a new one.
+
+    Args:
+        comic: Comic model instance
+        panels: Panel model instances with audio, in panel_number order
+
+    Returns:
+        str: Export path ending in .mp3
+    """
+    manifest = [(panel.panel_number, _chapter_title(panel), asset_hash(panel.audio_path) or panel.audio_path)
+                for panel in panels]
+    digest = DiskCache.make_key('audiobook', comic.title, manifest)[:HASH_LENGTH]
+    safe_title = "".join(c for c in comic.title if c.isalnum() or c in (' ', '-', '_')).rstrip() or "comic"
+    return f"static/exports/{safe_title}_audiobook_{digest}.mp3"
+
+
+def plan_audiobook(comic, panels):
+    """
+    Work out the chapter tag and total size of an audiobook before streaming it
+
+    Args:
+        comic: Comic model instance
+        panels: Panel model instances with audio, in panel_number order
+
+    Returns:
+        tuple: (ID3 chapter tag bytes, list of audio paths to join, total length in bytes)
+    """
+    chapters = []
+    audio_paths = []
+    position_ms = 0
+    total_bytes = 0
+    for panel in panels:
+        info = segment_info(panel.audio_path)
+        if info is None:
+            continue
+        duration_ms, frame_bytes = info
+        chapters.append((_chapter_title(panel), position_ms, position_ms + duration_ms))
+        audio_paths.append(panel.audio_path)
+        position_ms += duration_ms
+        total_bytes += frame_bytes
+
+    tag = build_chapter_tag(comic.title, chapters)
+    return tag, audio_paths, len(tag) + total_bytes
+
+
+def stream_audiobook(tag, audio_paths, path):
+    """
+    Yield the audiobook's bytes while also storing them at path
+
+    Panel narrations are copied frame by frame without re-encoding, one
+    segment at a time, so the whole book is never held in memory.
+
+    Args:
+        tag (bytes): Chapter tag from plan_audiobook
+        audio_paths (list): Narration files in playback order
+        path (str): Storage path for the finished audiobook
+
+    Yields:
+        bytes: Tag, then each segment's audio frames
+    """
+    storage = get_storage()
+    fd, tmp_path = tempfile.mkstemp(suffix='.mp3.tmp')
+    completed = False
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(tag)
+            yield tag
+            for audio_path in audio_paths:
+                with storage.open(audio_path) as audio_file:
+                    segment = audio_frames(audio_file.read())
+                f.write(segment)
+                yield segment
+        completed = True
+    finally:
+        if completed:
+            with open(tmp_path, 'rb') as f:
+                storage.save(path, f)
+            logging.info(f"Audiobook saved as {path}")
+        os.remove(tmp_path)
+
+
+def segment_info(audio_path):
+    """
+    Duration in milliseconds and audio frame byte count of a narration file
+
+    Returns:
+        tuple: (duration_ms, frame_bytes), or None if the file is missing or unreadable
+    """
+    try:
+        return _segment_info(audio_path)
+    except Exception as e:
+        logging.error(f"Error reading narration {audio_path}: {e}")
+        return None
+
+
+@lru_cache(maxsize=1024)
+def _segment_info(audio_path):
+    """
+    Parse a narration file for segment_info
+
+    Narration files are content-addressed and never change, so results are
+    cached per path; rebuilding after one narration changes only parses the
+    new file. Read errors propagate instead, so they are not cached.
+    """
+    with get_storage().open(audio_path) as f:
+        data = f.read()
+
+    duration = 0.0
+    frame_bytes = 0
+    for frame in iter_frames(data):
+        if not frame.is_info:
+            duration += frame.samples / frame.sample_rate
+            frame_bytes += frame.length
+    if not frame_bytes:
+        return None
+    return round(duration * 1000), frame_bytes
+
+
+def _chapter_title(panel):
+    return panel.title or f"Panel {panel.panel_number}"
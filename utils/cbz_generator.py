@@ -0,0 +1,157 @@
+import io
+import os
+import logging
+import zipfile
+from collections import namedtuple
+from xml.etree import ElementTree
+from services.storage import get_storage, STORAGE_CHUNK_SIZE
+
+CbzPage = namedtuple('CbzPage', ['name', 'path', 'size', 'date_time'])
+
+
+def plan_comic_cbz(comic, panels):
+    """
+    Work out the archive entries of a comic book archive before streaming it
+
+    Panels without a stored image are skipped. Everything is read from the
+    models here so streaming needs no database access.
+
+    Args:
+        comic: Comic model instance
+        panels: List of Panel model instances in reading order
+
+    Returns:
+        tuple: (ComicInfo.xml bytes, list of CbzPage), or (None, []) if no panel has an image
+    """
+    storage = get_storage()
+    pages = []
+    included = []
+    width = max(3, len(str(len(panels))))
+    for panel in panels:
+        if not panel.image_path or not storage.exists(panel.image_path):
+            continue
+        extension = os.path.splitext(panel.image_path)[1].lower() or '.jpg'
+        pages.append(CbzPage(
+            name=f"{len(pages) + 1:0{width}d}{extension}",
+            path=panel.image_path,
+            size=storage.size(panel.image_path),
+            date_time=_zip_date_time(panel.created_at or comic.created_at)
+        ))
+        included.append(panel)
+
+    if not pages:
+        return None, []
+    return comic_info_xml(comic, included, pages), pages
+
+
+def stream_comic_cbz(comic_info, pages, created_at=None):
+    """
+    Yield a CBZ archive of panel images followed by ComicInfo.xml
+
+    Images are stored without recompression and copied in chunks, so memory
+    use stays constant whatever the size of the comic. The archive is
+    written to a non-seekable sink, so each entry's size and CRC follow its
+    data in a data descriptor.
+
+    Args:
+        comic_info (bytes): ComicInfo.xml from plan_comic_cbz
+        pages (list): CbzPage entries from plan_comic_cbz
+        created_at (datetime): Timestamp for the ComicInfo.xml entry
+
+    Yields:
+        bytes: Successive parts of the archive
+    """
+    storage = get_storage()
+    sink = _StreamSink()
+    with zipfile.ZipFile(sink, 'w') as archive:
+        for page in pages:
+            info = zipfile.ZipInfo(page.name, date_time=page.date_time)
+            info.compress_type = zipfile.ZIP_STORED
+            info.file_size = page.size
+            with storage.open(page.path) as source, archive.open(info, 'w') as entry:
+                for chunk in iter(lambda: source.read(STORAGE_CHUNK_SIZE), b''):
+                    entry.write(chunk)
+                    yield from sink.drain()
+            yield from sink.drain()
+
+        info = zipfile.ZipInfo('ComicInfo.xml', date_time=_zip_date_time(created_at))
+        info.compress_type = zipfile.ZIP_DEFLATED
+        archive.writestr(info, comic_info)
+        yield from sink.drain()
+    yield from sink.drain()
+    logging.info(f"Streamed CBZ with {len(pages)} pages")
+
+
+def comic_info_xml(comic, panels, pages):
+    """
+    Build ComicInfo.xml (ComicRack schema) for a comic book archive
+
+    Args:
+        comic: Comic model instance
+        panels: Panel model instances included in the archive, in order
+        pages (list): Matching CbzPage entries
+
+    Returns:
+        bytes: UTF-8 encoded XML document
+    """
+    root = ElementTree.Element('ComicInfo', {
+        'xmlns:xsd': 'http://www.w3.org/2001/XMLSchema',
+        'xmlns:xsi': 'http://www.w3.org/2001/XMLSchema-instance',
+    })
+
+    def add(tag, value):
+        if value not in (None, ''):
+            ElementTree.SubElement(root, tag).text = str(value)
+
+    # Elements follow the order of the schema's sequence
+    add('Title', comic.title)
+    add('Summary', comic.description)
+    add('Notes', "Created with VisualTales" + (f" in {comic.style} style" if comic.style else ""))
+    if comic.created_at:
+        add('Year', comic.created_at.year)
+        add('Month', comic.created_at.month)
+        add('Day', comic.created_at.day)
+    add('Characters', ', '.join(comic.get_characters_dict()))
+    add('PageCount', len(pages))
+
+    pages_element = ElementTree.SubElement(root, 'Pages')
+    for index, (panel, page) in enumerate(zip(panels, pages)):
+        attributes = {'Image': str(index), 'ImageSize': str(page.size),
+                      'Bookmark': panel.title or f"Panel {panel.panel_number}"}
+        if index == 0:
+            attributes['Type'] = 'FrontCover'
+        if panel.image_width and panel.image_height:
+            attributes['ImageWidth'] = str(panel.image_width)
+            attributes['ImageHeight'] = str(panel.image_height)
+        ElementTree.SubElement(pages_element, 'Page', attributes)
+
+    ElementTree.indent(root)
+    return ElementTree.tostring(root, encoding='utf-8', xml_declaration=True)
+
+
+def _zip_date_time(timestamp):
+    """ZIP entry timestamp; the format cannot represent dates before 1980"""
+    if timestamp is None or timestamp.year < 1980:
+        return (1980, 1, 1, 0, 0, 0)
+    return timestamp.timetuple()[:6]
+
+
+class _StreamSink(io.RawIOBase):
+    """Write-only, non-seekable file that buffers what ZipFile writes until drained"""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        if data:
+            self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        """Return and forget the chunks written since the last drain"""
+        chunks, self._chunks = self._chunks, []
+        return chunks
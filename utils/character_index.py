@@ -0,0 +1,83 @@
+import re
+import json
+import logging
+from functools import lru_cache
+
+
+class CharacterIndex:
+    """
+    Compiled matcher for finding which characters a piece of text mentions
+
+    All names are folded into one case-insensitive regex alternation, longest
+    name first, anchored so that "Al" does not match inside "Alice".
+    """
+
+    def __init__(self, characters):
+        self.characters = characters or {}
+        self._names = {name.lower(): name for name in self.characters if name.strip()}
+
+        if self._names:
+            names = sorted(self._names, key=len, reverse=True)
+            alternation = '|'.join(re.escape(name) for name in names)
+            self._pattern = re.compile(rf'(?<!\w)(?:{alternation})(?!\w)', re.IGNORECASE)
+        else:
+            self._pattern = None
+
+    def mentioned(self, *texts):
+        """
+        Return the characters named in any of the given texts
+
+        Args:
+            *texts (str): Text to scan, e.g. a scene description
+
+        Returns:
+            dict: Character name to details, in definition order
+        """
+        if self._pattern is None:
+            return {}
+
+        found = set()
+        for text in texts:
+            if text:
+                found.update(self._names[match.lower()] for match in self._pattern.findall(text))
+
+        return {name: details for name, details in self.characters.items() if name in found}
+
+    def items(self):
+        return self.characters.items()
+
+    def __len__(self):
+        return len(self.characters)
+
+    def __bool__(self):
+        return bool(self.characters)
+
+
+@lru_cache(maxsize=256)
+def get_character_index(characters_json):
+    """
+    Build (or reuse) the index for a comic's stored character JSON
+
+    The raw JSON string acts as the character version: any edit to a comic's
+    characters produces a different string and therefore a fresh index.
+
+    Args:
+        characters_json (str): Comic.characters column value
+
+    Returns:
+        CharacterIndex: Compiled index, shared between callers
+    """
+    characters = {}
+    if characters_json:
+        try:
+            characters = json.loads(characters_json)
+        except json.JSONDecodeError:
+            logging.error("Invalid character JSON, using empty character index")
+    return CharacterIndex(characters)
+
+
+def as_character_index(characters):
+    """Accept either a CharacterIndex or a plain character dict"""
+    if isinstance(characters, CharacterIndex):
+        return characters
+    return get_character_index(json.dumps(characters or {}, sort_keys=True))
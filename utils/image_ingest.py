@@ -0,0 +1,73 @@
+import io
+import os
+import logging
+from collections import namedtuple
+from PIL import Image
+from utils.asset_files import write_asset
+
+# Model output is re-encoded to this format before it is stored ("jpeg" or "webp")
+IMAGE_INGEST_FORMAT = os.environ.get("IMAGE_INGEST_FORMAT", "jpeg").lower()
+IMAGE_INGEST_QUALITY = int(os.environ.get("IMAGE_INGEST_QUALITY", "85"))
+
+INGEST_ENCODERS = {
+    'jpeg': ('jpg', {'format': 'JPEG', 'optimize': True, 'progressive': True}),
+    'webp': ('webp', {'format': 'WEBP', 'method': 4}),
+}
+
+IngestedImage = namedtuple('IngestedImage', ['path', 'width', 'height', 'bytes'])
+
+
+def normalize_image(data, fmt=None, quality=None):
+    """
+    Re-encode image bytes of any format Pillow reads, dropping all metadata
+
+    Args:
+        data (bytes): Raw image data, e.g. a PNG returned by the model
+        fmt (str): "jpeg" or "webp"; defaults to IMAGE_INGEST_FORMAT
+        quality (int): Encoder quality; defaults to IMAGE_INGEST_QUALITY
+
+    Returns:
+        tuple: (encoded bytes, file extension, width, height)
+    """
+    fmt = fmt or IMAGE_INGEST_FORMAT
+    if fmt not in INGEST_ENCODERS:
+        logging.warning(f"Unknown IMAGE_INGEST_FORMAT {fmt!r}, using jpeg")
+        fmt = 'jpeg'
+    extension, options = INGEST_ENCODERS[fmt]
+
+    with Image.open(io.BytesIO(data)) as source:
+        logging.debug(f"Ingesting {source.format} image {source.width}x{source.height}, {len(data)} bytes")
+        image = _flatten(source)
+
+    # Only pixels are written: EXIF, ICC profiles, text chunks and the like are not copied
+    buffer = io.BytesIO()
+    image.save(buffer, quality=quality or IMAGE_INGEST_QUALITY, **options)
+    return buffer.getvalue(), extension, image.width, image.height
+
+
+def ingest_image(directory, prefix, data):
+    """
+    Normalize model output and store it under a content-hash name
+
+    Args:
+        directory (str): Target directory, e.g. "static/images"
+        prefix (str): Human-readable name prefix, e.g. "panel"
+        data (bytes): Raw image data as returned by the backend
+
+    Returns:
+        IngestedImage: Path, dimensions and byte size of the stored image
+    """
+    encoded, extension, width, height = normalize_image(data)
+    path = write_asset(directory, prefix, encoded, extension)
+    logging.info(f"Stored {width}x{height} image as {path} ({len(data)} -> {len(encoded)} bytes)")
+    return IngestedImage(path, width, height, len(encoded))
+
+
+def _flatten(image):
+    """Convert to RGB, compositing any transparency onto white"""
+    if image.mode in ('RGBA', 'LA', 'PA') or (image.mode == 'P' and 'transparency' in image.info):
+        rgba = image.convert('RGBA')
+        background = Image.new('RGB', rgba.size, (255, 255, 255))
+        background.paste(rgba, mask=rgba.getchannel('A'))
+        return background
+    return image.convert('RGB')
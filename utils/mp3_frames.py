@@ -0,0 +1,155 @@
+import struct
+from collections import namedtuple
+
+# Layer III bitrates in kbps by bitrate index, for MPEG-1 and MPEG-2/2.5
+_BITRATES = {
+    'mpeg1': [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    'mpeg2': [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+_SAMPLE_RATES = {
+    3: [44100, 48000, 32000],  # MPEG-1
+    2: [22050, 24000, 16000],  # MPEG-2
+    0: [11025, 12000, 8000],   # MPEG-2.5
+}
+
+Mp3Frame = namedtuple('Mp3Frame', ['offset', 'length', 'samples', 'sample_rate', 'is_info'])
+
+
+def parse_frame_header(data, offset):
+    """
+    Parse the MPEG Layer III frame header at an offset
+
+    Returns:
+        Mp3Frame: Frame description, or None if no valid header starts there
+    """
+    if offset + 4 > len(data):
+        return None
+    b0, b1, b2, b3 = data[offset:offset + 4]
+    if b0 != 0xFF or (b1 & 0xE0) != 0xE0:
+        return None
+
+    version = (b1 >> 3) & 0x03
+    layer = (b1 >> 1) & 0x03
+    bitrate_index = b2 >> 4
+    sample_rate_index = (b2 >> 2) & 0x03
+    if version == 1 or layer != 1 or bitrate_index in (0, 15) or sample_rate_index == 3:
+        return None
+
+    mpeg1 = version == 3
+    bitrate = _BITRATES['mpeg1' if mpeg1 else 'mpeg2'][bitrate_index] * 1000
+    sample_rate = _SAMPLE_RATES[version][sample_rate_index]
+    padding = (b2 >> 1) & 0x01
+    length = (144 if mpeg1 else 72) * bitrate // sample_rate + padding
+    samples = 1152 if mpeg1 else 576
+
+    # A Xing/Info/VBRI header frame carries stream metadata, not audio
+    mono = (b3 >> 6) == 3
+    side_info = (17 if mono else 32) if mpeg1 else (9 if mono else 17)
+    tag_offset = offset + 4 + side_info
+    is_info = (data[tag_offset:tag_offset + 4] in (b'Xing', b'Info')
+               or data[offset + 36:offset + 40] == b'VBRI')
+
+    return Mp3Frame(offset, length, samples, sample_rate, is_info)
+
+
+def iter_frames(data):
+    """
+    Yield the audio frames of an MP3, skipping ID3 tags and any junk between frames
+
+    Args:
+        data (bytes): MP3 file contents
+
+    Yields:
+        Mp3Frame: One entry per frame, in order
+    """
+    offset = _skip_id3v2(data)
+    end = len(data) - (128 if data[-128:-125] == b'TAG' else 0)
+    while offset < end:
+        frame = parse_frame_header(data, offset)
+        if frame is None or offset + frame.length > end:
+            offset += 1
+            continue
+        yield frame
+        offset += frame.length
+
+
+def audio_frames(data):
+    """Return only the audio frames of an MP3, without tags or Xing/Info frames"""
+    return b''.join(data[frame.offset:frame.offset + frame.length]
+                    for frame in iter_frames(data) if not frame.is_info)
+
+
+def concat_mp3(parts):
+    """
+    Join MP3 files into one stream without re-encoding
+
+    Each part's ID3 tags and Xing/Info header are dropped so players read
+    the result as one continuous stream of frames. Parts should share a
+    sample rate and channel layout, as same-voice TTS output does. A part
+    in which no frames are found is copied unchanged.
+
+    Args:
+        parts (list): MP3 file contents, in playback order
+
+    Returns:
+        bytes: Concatenated MP3 data
+    """
+    return b''.join(audio_frames(part) or part for part in parts)
+
+
+def mp3_duration(data):
+    """Playback duration of an MP3 in seconds, counted from its frames"""
+    return sum(frame.samples / frame.sample_rate for frame in iter_frames(data) if not frame.is_info)
+
+
+def build_chapter_tag(title, chapters):
+    """
+    Build an ID3v2.4 tag with a table of contents and one chapter per entry
+
+    Args:
+        title (str): Album/book title (TIT2 of the tag and the table of contents)
+        chapters (list): (title, start_ms, end_ms) tuples in playback order;
+            at most 255, the limit of a single CTOC frame
+
+    Returns:
+        bytes: Tag to place before the first audio frame
+    """
+    chapters = chapters[:255]
+    element_ids = [f"chp{index}".encode('ascii') for index in range(len(chapters))]
+
+    frames = [_text_frame('TIT2', title)]
+    toc = b'toc\x00' + bytes([0x03, len(chapters)])  # top-level, ordered
+    toc += b''.join(element_id + b'\x00' for element_id in element_ids)
+    frames.append(_frame('CTOC', toc + _text_frame('TIT2', title)))
+
+    for element_id, (chapter_title, start_ms, end_ms) in zip(element_ids, chapters):
+        # Byte offsets are left unset (0xFFFFFFFF) so players seek by time
+        body = element_id + b'\x00' + struct.pack('>IIII', start_ms, end_ms, 0xFFFFFFFF, 0xFFFFFFFF)
+        frames.append(_frame('CHAP', body + _text_frame('TIT2', chapter_title)))
+
+    payload = b''.join(frames)
+    return b'ID3\x04\x00\x00' + _syncsafe(len(payload)) + payload
+
+
+def _frame(frame_id, body):
+    return frame_id.encode('ascii') + _syncsafe(len(body)) + b'\x00\x00' + body
+
+
+def _text_frame(frame_id, text):
+    return _frame(frame_id, b'\x03' + (text or '').encode('utf-8'))  # 0x03 = UTF-8
+
+
+def _syncsafe(value):
+    return bytes([(value >> 21) & 0x7F, (value >> 14) & 0x7F, (value >> 7) & 0x7F, value & 0x7F])
+
+
+def _skip_id3v2(data):
+    """Offset of the first byte after any leading ID3v2 tags"""
+    offset = 0
+    while data[offset:offset + 3] == b'ID3' and len(data) >= offset + 10:
+        size = 0
+        for byte in data[offset + 6:offset + 10]:
+            size = (size << 7) | (byte & 0x7F)  # syncsafe integer
+        footer = 10 if data[offset + 5] & 0x10 else 0
+        offset += 10 + size + footer
+    return offset
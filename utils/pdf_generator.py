@@ -1,137 +1,413 @@
+import io
 import os
 import logging
+import tempfile
+from bisect import bisect_right
+from contextlib import ExitStack
+from functools import lru_cache
 from reportlab.lib.pagesizes import letter, A4
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image as RLImage, PageBreak
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
 from reportlab.lib.enums import TA_CENTER, TA_LEFT
 from PIL import Image
-from datetime import datetime
+from utils.asset_files import HASH_LENGTH, asset_hash
+from services.disk_cache import DiskCache
+from services.image_derivatives import resample_images
+from services.storage import get_storage
 
-def create_comic_pdf(comic, panels):
+# Bump when the PDF layout changes so cached exports are rebuilt
+PDF_LAYOUT_VERSION = 2
+# PDFs are built in memory and only spill to a temporary file above this size
+PDF_SPOOL_MAX_BYTES = int(os.environ.get("PDF_SPOOL_MAX_BYTES", str(16 * 1024 * 1024)))
+
+# Export presets: the resolution panel images are downsampled to and their JPEG quality
+PDF_PRESETS = {
+    'screen': {'dpi': int(os.environ.get("PDF_SCREEN_DPI", "150")),
+               'quality': int(os.environ.get("PDF_SCREEN_QUALITY", "75"))},
+    'print': {'dpi': int(os.environ.get("PDF_PRINT_DPI", "300")),
+              'quality': int(os.environ.get("PDF_PRINT_QUALITY", "90"))},
+}
+DEFAULT_PDF_PRESET = os.environ.get("PDF_DEFAULT_PRESET", "screen")
+# "flow" lays out the whole comic in one pass; "fragments" starts each panel on a
+# new page and reuses cached per-panel PDFs (needs the optional pypdf package)
+PDF_ASSEMBLY = os.environ.get("PDF_ASSEMBLY", "flow").lower()
+# Box each panel image is fitted into on the page
+PANEL_IMAGE_BOX = (6 * inch, 4 * inch)
+
+# Downsampled panel images keyed by source image, box and preset
+pdf_image_cache = DiskCache(
+    os.environ.get("PDF_IMAGE_CACHE_DIR", "instance/cache/pdf_images"),
+    int(os.environ.get("PDF_IMAGE_CACHE_MAX_BYTES", str(200 * 1024 * 1024))),
+    name="PDF image cache"
+)
+
+# Rendered single-panel PDFs for PDF_ASSEMBLY=fragments, keyed by panel content
+pdf_fragment_cache = DiskCache(
+    os.environ.get("PDF_FRAGMENT_CACHE_DIR", "instance/cache/pdf_fragments"),
+    int(os.environ.get("PDF_FRAGMENT_CACHE_MAX_BYTES", str(500 * 1024 * 1024))),
+    name="PDF fragment cache"
+)
+
+def comic_pdf_path(comic, panels, preset=DEFAULT_PDF_PRESET):
+    """
+    Export path of a comic PDF, named after a fingerprint of everything it shows
+    
+    Any change to the comic's title, description or date, to a panel's
+    number, title, description, narration or image, or to the export
+    preset, yields a new path, so a stored export can be reused as long as
+    its path exists.
+    
+    Args:
+        comic: Comic model instance
+        panels: List of Panel model instances in export order
+        preset (str): Key of PDF_PRESETS
+    
+    Returns:
+        str: Path under static/exports
+    """
+    fingerprint = DiskCache.make_key(
+        'comic_pdf', PDF_LAYOUT_VERSION, PDF_PRESETS[preset], _assembly_mode(),
+        comic.title, comic.description, comic.created_at.strftime("%Y-%m-%d"),
+        [(panel.panel_number, panel.title, panel.description, panel.narration_text, panel.image_path)
+         for panel in panels]
+    )
+    return _export_path(_safe_filename(comic.title), fingerprint)
+
+def character_sheet_pdf_path(comic):
+    """Export path of a character sheet PDF, named after a fingerprint of the characters"""
+    fingerprint = DiskCache.make_key('character_sheet', PDF_LAYOUT_VERSION, comic.title, comic.get_characters_dict())
+    return _export_path(f"{_safe_filename(comic.title)}_characters", fingerprint)
+
+def create_comic_pdf(comic, panels, preset=DEFAULT_PDF_PRESET, on_progress=None):
     """
     Create a PDF from comic panels
     
     Args:
         comic: Comic model instance
         panels: List of Panel model instances
+        preset (str): Key of PDF_PRESETS
+        on_progress (callable): See export_comic_pdf
     
     Returns:
         str: Path to the generated PDF file, or None if failed
     """
+    pdf_path, buffer = export_comic_pdf(comic, panels, preset, on_progress)
+    if buffer is not None:
+        buffer.close()
+    return pdf_path
+
+def export_comic_pdf(comic, panels, preset=DEFAULT_PDF_PRESET, on_progress=None):
+    """
+    Return a comic's stored PDF, building and storing it first if needed
+    
+    A fresh build is rendered into a spooled buffer (memory up to
+    PDF_SPOOL_MAX_BYTES, then a temporary file) and also handed back, so
+    the caller can stream it without reading the stored copy again.
+    
+    Args:
+        comic: Comic model instance
+        panels: List of Panel model instances
+        preset (str): Key of PDF_PRESETS
+        on_progress (callable): Called as on_progress(stage, panels_done, total)
+            with stage "images", "layout" or "storing" while a new PDF is built
+    
+    Returns:
+        tuple: (path, buffer) where buffer is the just-built PDF positioned at
+        its start, or None if the stored export was reused; (None, None) on failure
+    """
+    buffer = None
     try:
-        # Ensure exports directory exists
-        os.makedirs("static/exports", exist_ok=True)
+        storage = get_storage()
         
-        # Generate PDF filename
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        safe_title = "".join(c for c in comic.title if c.isalnum() or c in (' ', '-', '_')).rstrip()
-        pdf_path = f"static/exports/{safe_title}_{timestamp}.pdf"
+        # Reuse the stored export if nothing it shows has changed
+        pdf_path = comic_pdf_path(comic, panels, preset)
+        if storage.exists(pdf_path):
+            logging.info(f"Reusing cached PDF export {pdf_path}")
+            return pdf_path, None
         
-        # Create PDF document
-        doc = SimpleDocTemplate(pdf_path, pagesize=A4, 
-                               rightMargin=72, leftMargin=72,
-                               topMargin=72, bottomMargin=18)
+        report = on_progress or (lambda stage, done, total: None)
+        buffer = tempfile.SpooledTemporaryFile(max_size=PDF_SPOOL_MAX_BYTES)
+        if _assembly_mode() == 'fragments':
+            _assemble_from_fragments(buffer, comic, panels, preset, report)
+        else:
+            _build_comic_document(buffer, comic, panels, preset, report)
         
-        # Get styles
-        styles = getSampleStyleSheet()
-        title_style = ParagraphStyle(
+        report('storing', len(panels), len(panels))
+        _store_buffer(buffer, pdf_path)
+        logging.info(f"PDF created successfully: {pdf_path}")
+        return pdf_path, buffer
+        
+    except Exception as e:
+        logging.error(f"Error creating PDF: {e}")
+        if buffer is not None:
+            buffer.close()
+        return None, None
+
+def _build_comic_document(buffer, comic, panels, preset, report):
+    """Lay out the whole comic in one pass, panels flowing across pages"""
+    report('images', 0, len(panels))
+    panel_images = _prepare_panel_images(panels, preset)
+    
+    doc = _comic_document(buffer)
+    styles = _comic_styles()
+    
+    # Panel images must stay on local disk until the document is built
+    with ExitStack() as images:
+        # Build PDF content
+        story = _title_flowables(comic, styles)
+        
+        # Index in the story just past each panel's flowables, for progress reporting
+        panel_ends = []
+        
+        # Add each panel
+        for panel in panels:
+            story.extend(_panel_flowables(panel, panel_images, images, styles))
+            panel_ends.append(len(story))
+        
+        story.extend(_footer_flowables(comic, styles))
+        
+        # Build PDF
+        doc.setProgressCallBack(_layout_progress(panel_ends, report))
+        doc.build(story)
+
+def _assemble_from_fragments(buffer, comic, panels, preset, report):
+    """
+    Build the comic by merging one cached PDF fragment per panel
+    
+    Each panel starts on its own page, so its fragment depends only on the
+    panel and the preset. Fragments are cached by a hash of that content;
+    after an edit only the changed panels are laid out again, and the
+    title and footer pages are cheap to render every time.
+    """
+    from pypdf import PdfReader, PdfWriter
+    
+    styles = _comic_styles()
+    keys = [_fragment_key(panel, preset) for panel in panels]
+    fragments = [pdf_fragment_cache.get(key) for key in keys]
+    missing = [panel for panel, fragment in zip(panels, fragments) if fragment is None]
+    
+    report('images', 0, len(panels))
+    panel_images = _prepare_panel_images(missing, preset)
+    
+    writer = PdfWriter()
+    writer.append(PdfReader(io.BytesIO(_render_fragment(_title_flowables(comic, styles)))))
+    report('layout', 0, len(panels))
+    for index, (panel, key, fragment) in enumerate(zip(panels, keys, fragments), start=1):
+        if fragment is None:
+            with ExitStack() as images:
+                fragment = _render_fragment(_panel_flowables(panel, panel_images, images, styles))
+            pdf_fragment_cache.put(key, fragment)
+        writer.append(PdfReader(io.BytesIO(fragment)))
+        report('layout', index, len(panels))
+    writer.append(PdfReader(io.BytesIO(_render_fragment(_footer_flowables(comic, styles)))))
+    
+    writer.write(buffer)
+    logging.info(f"Assembled PDF from {len(panels)} panel fragments, {len(missing)} newly rendered")
+
+def _render_fragment(flowables):
+    """Lay out flowables as a standalone PDF with the comic page setup"""
+    fragment = io.BytesIO()
+    _comic_document(fragment).build(flowables)
+    return fragment.getvalue()
+
+def _fragment_key(panel, preset):
+    """Cache key of a panel's PDF fragment: everything the fragment shows"""
+    return DiskCache.make_key(
+        'pdf_fragment', PDF_LAYOUT_VERSION, PDF_PRESETS[preset],
+        panel.panel_number, panel.title, panel.description, panel.narration_text,
+        asset_hash(panel.image_path) or panel.image_path
+    )
+
+@lru_cache(maxsize=None)
+def _assembly_mode():
+    """The configured PDF_ASSEMBLY, or "flow" if fragments need pypdf and it is missing"""
+    if PDF_ASSEMBLY != 'fragments':
+        return 'flow'
+    try:
+        import pypdf  # noqa: F401
+    except ImportError:
+        logging.warning("PDF_ASSEMBLY=fragments needs pypdf, which is not installed (install the pdf extra); using flow layout")
+        return 'flow'
+    return 'fragments'
+
+def _comic_document(buffer):
+    return SimpleDocTemplate(buffer, pagesize=A4, 
+                             rightMargin=72, leftMargin=72,
+                             topMargin=72, bottomMargin=18)
+
+def _comic_styles():
+    """Paragraph styles of the comic PDF"""
+    styles = getSampleStyleSheet()
+    return {
+        'title': ParagraphStyle(
             'CustomTitle',
             parent=styles['Heading1'],
             fontSize=24,
             spaceAfter=30,
             alignment=TA_CENTER,
             textColor='black'
-        )
-        
-        panel_title_style = ParagraphStyle(
+        ),
+        'panel_title': ParagraphStyle(
             'PanelTitle',
             parent=styles['Heading2'],
             fontSize=16,
             spaceAfter=10,
             spaceBefore=20,
             alignment=TA_CENTER
-        )
-        
-        description_style = ParagraphStyle(
+        ),
+        'description': ParagraphStyle(
             'Description',
             parent=styles['Normal'],
             fontSize=12,
             spaceAfter=15,
             alignment=TA_LEFT
-        )
-        
-        # Build PDF content
-        story = []
-        
-        # Add title
-        story.append(Paragraph(comic.title, title_style))
-        
-        # Add comic description if available
-        if comic.description:
-            story.append(Paragraph(f"<i>{comic.description}</i>", description_style))
-        
-        story.append(Spacer(1, 20))
-        
-        # Add each panel
-        for panel in panels:
-            # Panel title - use descriptive title or fallback to panel number
-            panel_title = panel.title if hasattr(panel, 'title') and panel.title else f"Panel {panel.panel_number}"
-            story.append(Paragraph(panel_title, panel_title_style))
-            
-            # Add panel image if it exists
-            if panel.image_path and os.path.exists(panel.image_path):
-                try:
-                    # Resize image to fit page
-                    img = _resize_image_for_pdf(panel.image_path)
-                    if img:
-                        story.append(img)
-                except Exception as e:
-                    logging.error(f"Error adding image to PDF: {e}")
-                    story.append(Paragraph(f"[Image not available: {panel.image_path}]", description_style))
-            
-            # Add scene description
-            story.append(Paragraph(f"<b>Scene:</b> {panel.description}", description_style))
-            
-            # Add narration if available
-            if panel.narration_text:
-                story.append(Paragraph(f"<b>Narration:</b> {panel.narration_text}", description_style))
-            
-            # Add space between panels
-            story.append(Spacer(1, 30))
-        
-        # Add creation date
-        creation_date = comic.created_at.strftime("%B %d, %Y")
-        story.append(Spacer(1, 50))
-        story.append(Paragraph(f"<i>Created on {creation_date} with VisualTales</i>", 
-                             ParagraphStyle('Footer', parent=styles['Normal'], 
-                                          fontSize=10, alignment=TA_CENTER)))
-        
-        # Build PDF
-        doc.build(story)
-        logging.info(f"PDF created successfully: {pdf_path}")
-        return pdf_path
-        
-    except Exception as e:
-        logging.error(f"Error creating PDF: {e}")
-        return None
+        ),
+        'footer': ParagraphStyle('Footer', parent=styles['Normal'], fontSize=10, alignment=TA_CENTER),
+    }
+
+def _title_flowables(comic, styles):
+    # Add title
+    story = [Paragraph(comic.title, styles['title'])]
+    
+    # Add comic description if available
+    if comic.description:
+        story.append(Paragraph(f"<i>{comic.description}</i>", styles['description']))
+    
+    story.append(Spacer(1, 20))
+    return story
+
+def _panel_flowables(panel, panel_images, images, styles):
+    """
+    Flowables of one panel: title, image, scene description and narration
+    
+    Args:
+        panel: Panel model instance
+        panel_images (dict): Prepared images from _prepare_panel_images
+        images (ExitStack): Keeps local copies of original images open until the build
+        styles (dict): Styles from _comic_styles
+    """
+    storage = get_storage()
+    description_style = styles['description']
+    
+    # Panel title - use descriptive title or fallback to panel number
+    panel_title = panel.title if hasattr(panel, 'title') and panel.title else f"Panel {panel.panel_number}"
+    story = [Paragraph(panel_title, styles['panel_title'])]
+    
+    # Add panel image if it exists
+    if panel.image_path and storage.exists(panel.image_path):
+        try:
+            # Resize image to fit page
+            prepared = panel_images.get(panel.image_path)
+            if prepared:
+                data, size = prepared
+                img = _resize_image_for_pdf(io.BytesIO(data), *PANEL_IMAGE_BOX, image_size=size)
+            else:
+                # Downsampling failed, embed the original
+                local_path = images.enter_context(storage.local_copy(panel.image_path))
+                img = _resize_image_for_pdf(local_path, *PANEL_IMAGE_BOX,
+                                            image_size=_stored_image_size(panel))
+            if img:
+                story.append(img)
+        except Exception as e:
+            logging.error(f"Error adding image to PDF: {e}")
+            story.append(Paragraph(f"[Image not available: {panel.image_path}]", description_style))
+    
+    # Add scene description
+    story.append(Paragraph(f"<b>Scene:</b> {panel.description}", description_style))
+    
+    # Add narration if available
+    if panel.narration_text:
+        story.append(Paragraph(f"<b>Narration:</b> {panel.narration_text}", description_style))
+    
+    # Add space between panels
+    story.append(Spacer(1, 30))
+    return story
+
+def _footer_flowables(comic, styles):
+    # Add creation date
+    creation_date = comic.created_at.strftime("%B %d, %Y")
+    return [Spacer(1, 50),
+            Paragraph(f"<i>Created on {creation_date} with VisualTales</i>", styles['footer'])]
+
+def _layout_progress(panel_ends, report):
+    """ReportLab progress callback that reports each panel once it is laid out"""
+    reported = [0]
+    
+    def callback(kind, value):
+        if kind != 'PROGRESS':
+            return
+        done = bisect_right(panel_ends, value)
+        if done > reported[0]:
+            reported[0] = done
+            report('layout', done, len(panel_ends))
+    
+    report('layout', 0, len(panel_ends))
+    return callback
+
+def _prepare_panel_images(panels, preset):
+    """
+    Downsample panel images to the preset's resolution for embedding
+    
+    Each image is fitted to PANEL_IMAGE_BOX at the preset DPI, never
+    enlarged, and re-encoded as JPEG. Results are cached per image and
+    preset; misses are resampled in parallel in the process pool.
+    
+    Args:
+        panels: List of Panel model instances
+        preset (str): Key of PDF_PRESETS
+    
+    Returns:
+        dict: Image path -> (JPEG bytes, (width, height)) for every image that
+        could be prepared
+    """
+    settings = PDF_PRESETS[preset]
+    box = [round(points / inch * settings['dpi']) for points in PANEL_IMAGE_BOX]
+    
+    prepared = {}
+    misses = {}
+    for image_path in dict.fromkeys(panel.image_path for panel in panels if panel.image_path):
+        key = DiskCache.make_key('pdf_image', asset_hash(image_path) or image_path, box, settings['quality'])
+        data = pdf_image_cache.get(key)
+        if data:
+            prepared[image_path] = data
+        else:
+            misses[image_path] = key
+    
+    if misses:
+        jobs = [(image_path, *box, settings['quality']) for image_path in misses]
+        for (image_path, key), data in zip(misses.items(), resample_images(jobs)):
+            if data:
+                pdf_image_cache.put(key, data)
+                prepared[image_path] = data
+        logging.info(f"Downsampled {len(misses)} images to {settings['dpi']} DPI for PDF export")
+    
+    result = {}
+    for image_path, data in prepared.items():
+        with Image.open(io.BytesIO(data)) as img:
+            result[image_path] = (data, img.size)
+    return result
 
-def _resize_image_for_pdf(image_path, max_width=6*inch, max_height=4*inch):
+def _resize_image_for_pdf(image_path, max_width=6*inch, max_height=4*inch, image_size=None):
     """
     Resize image to fit in PDF while maintaining aspect ratio
     
     Args:
-        image_path (str): Path to the image file
+        image_path: Path to the image file, or a file object with its data
         max_width (float): Maximum width in points
         max_height (float): Maximum height in points
+        image_size (tuple): Known (width, height) in pixels, to avoid opening the file
     
     Returns:
         RLImage: ReportLab Image object, or None if failed
     """
     try:
-        # Open image to get dimensions
-        with Image.open(image_path) as img:
-            img_width, img_height = img.size
+        if image_size:
+            img_width, img_height = image_size
+        else:
+            # Open image to get dimensions
+            with Image.open(image_path) as img:
+                img_width, img_height = img.size
         
         # Calculate scaling factor
         width_ratio = max_width / img_width
@@ -165,16 +441,16 @@ def create_character_sheet_pdf(comic):
         if not characters:
             return None
         
-        # Ensure exports directory exists
-        os.makedirs("static/exports", exist_ok=True)
-        
-        # Generate PDF filename
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        safe_title = "".join(c for c in comic.title if c.isalnum() or c in (' ', '-', '_')).rstrip()
-        pdf_path = f"static/exports/{safe_title}_characters_{timestamp}.pdf"
+        # Reuse the stored export if the characters have not changed
+        storage = get_storage()
+        pdf_path = character_sheet_pdf_path(comic)
+        if storage.exists(pdf_path):
+            logging.info(f"Reusing cached character sheet {pdf_path}")
+            return pdf_path
         
         # Create PDF document
-        doc = SimpleDocTemplate(pdf_path, pagesize=A4)
+        buffer = tempfile.SpooledTemporaryFile(max_size=PDF_SPOOL_MAX_BYTES)
+        doc = SimpleDocTemplate(buffer, pagesize=A4)
         
         # Get styles
         styles = getSampleStyleSheet()
@@ -215,9 +491,30 @@ def create_character_sheet_pdf(comic):
         
         # Build PDF
         doc.build(story)
+        with buffer:
+            _store_buffer(buffer, pdf_path)
         logging.info(f"Character sheet PDF created: {pdf_path}")
         return pdf_path
         
     except Exception as e:
         logging.error(f"Error creating character sheet PDF: {e}")
         return None
+
+def _stored_image_size(panel):
+    """Image dimensions recorded at ingest, or None for panels created before that"""
+    if panel.image_width and panel.image_height:
+        return panel.image_width, panel.image_height
+    return None
+
+def _safe_filename(title):
+    """Strip characters that are unsafe in file names"""
+    return "".join(c for c in title if c.isalnum() or c in (' ', '-', '_')).rstrip() or "comic"
+
+def _export_path(name, fingerprint):
+    return f"static/exports/{name}_{fingerprint[:HASH_LENGTH]}.pdf"
+
+def _store_buffer(buffer, pdf_path):
+    """Save a finished build to storage and rewind it for reading"""
+    buffer.seek(0)
+    get_storage().save(pdf_path, buffer)
+    buffer.seek(0)
@@ -0,0 +1,6 @@
+from app import app
+from services.job_queue import run_worker
+
+if __name__ == '__main__':
+    # Processes jobs queued with JOB_BACKEND=external
+    run_worker()